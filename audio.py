@@ -0,0 +1,219 @@
+# audio.py
+import math
+import time
+import wave
+import numpy as np
+from metrics import now
+
+
+# --- SOURCES ---
+# 16-bit mono PCM in fixed frames of frame_ms. read() returns one frame as
+# an int16 array (reused on the next read) or None at the end of a file; a
+# microphone read blocks for at most one frame, which is what lets the
+# voice thread stop cooperatively.
+
+class MicrophoneSource:
+    def __init__(self, sample_rate=16000, frame_ms=30, device=None):
+        self.sample_rate = sample_rate
+        self.frame_samples = sample_rate * frame_ms // 1000
+        self.device = device
+        self.pa = None
+        self.stream = None
+
+    def open(self):
+        import pyaudio
+        self.pa = pyaudio.PyAudio()
+        try:
+            self.stream = self.pa.open(format=pyaudio.paInt16, channels=1, rate=self.sample_rate, input=True,
+                                       frames_per_buffer=self.frame_samples, input_device_index=self.device)
+        except Exception:
+            # No (or a busy) input device: close() only cleans up an open
+            # stream, so PortAudio is released here
+            self.pa.terminate()
+            self.pa = None
+            raise
+
+    def read(self):
+        # A late reader gets the oldest buffered audio, never an exception
+        data = self.stream.read(self.frame_samples, exception_on_overflow=False)
+        return np.frombuffer(data, np.int16)
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.stop_stream()
+            self.stream.close()
+            self.pa.terminate()
+            self.stream = self.pa = None
+
+
+class WavSource:
+    # A recorded phrase or session, for tests and replays. realtime paces
+    # the reads like a microphone; otherwise the file is read flat out.
+
+    def __init__(self, path, frame_ms=30, realtime=False):
+        self.path = path
+        self.frame_ms = frame_ms
+        self.realtime = realtime
+        self.wav = None
+
+    def open(self):
+        self.wav = wave.open(self.path, "rb")
+        if self.wav.getsampwidth() != 2 or self.wav.getnchannels() != 1:
+            self.wav.close()
+            raise ValueError(f"{self.path}: need 16-bit mono PCM")
+        self.sample_rate = self.wav.getframerate()
+        self.frame_samples = self.sample_rate * self.frame_ms // 1000
+        self._frame = np.zeros(self.frame_samples, np.int16)
+        self._next_t = now()
+
+    def read(self):
+        data = self.wav.readframes(self.frame_samples)
+        if not data:
+            return None
+        if self.realtime:
+            self._next_t += self.frame_samples / self.sample_rate
+            time.sleep(max(0.0, self._next_t - now()))
+        n = len(data) // 2
+        self._frame[:n] = np.frombuffer(data, np.int16)
+        self._frame[n:] = 0     # last frame of the file, zero padded
+        return self._frame
+
+    def close(self):
+        if self.wav is not None:
+            self.wav.close()
+            self.wav = None
+
+
+def make_audio_source(settings):
+    if settings["voice_wav_path"]:
+        return WavSource(settings["voice_wav_path"], realtime=True)
+    return MicrophoneSource(settings["voice_sample_rate"])
+
+
+# --- BUFFERING / SEGMENTATION ---
+
+class PcmRing:
+    # Fixed number of PCM frames, oldest overwritten. Holds the audio just
+    # before a detected onset (the pre-roll).
+
+    def __init__(self, frames, frame_samples):
+        self.buf = np.zeros((frames, frame_samples), np.int16)
+        self.capacity = frames
+        self.index = 0
+        self.count = 0
+
+    def write(self, frame):
+        self.buf[self.index] = frame
+        self.index = (self.index + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def copy_last(self, n, out):
+        # Last n frames (fewer if not filled yet) into out in order;
+        # returns the number of samples written
+        n = min(n, self.count)
+        start = (self.index - n) % self.capacity
+        fs = self.buf.shape[1]
+        for k in range(n):
+            out[k * fs:(k + 1) * fs] = self.buf[(start + k) % self.capacity]
+        return n * fs
+
+    def clear(self):
+        self.index = self.count = 0
+
+
+class EnergyVad:
+    # Speech when a frame's RMS is `ratio` times the noise floor and above
+    # min_rms. The floor follows quiet frames: straight down, slowly up.
+
+    def __init__(self, ratio=3.0, min_rms=200.0, adapt=0.05):
+        self.ratio = ratio
+        self.min_rms = min_rms
+        self.adapt = adapt
+        self.floor = None
+        self._f = None
+
+    def is_speech(self, frame):
+        if self._f is None or self._f.shape != frame.shape:
+            self._f = np.empty(frame.shape, np.float32)
+        f = self._f
+        f[:] = frame
+        rms = math.sqrt(float(np.dot(f, f)) / len(f))
+        if self.floor is None:
+            self.floor = rms
+        speech = rms > max(self.floor * self.ratio, self.min_rms)
+        if not speech:
+            self.floor = rms if rms < self.floor else self.floor + self.adapt * (rms - self.floor)
+        return speech
+
+
+class PhraseSegmenter:
+    # VAD-gated phrases, one frame at a time:
+    #   - onset after onset_frames consecutive speech frames; the phrase then
+    #     starts pre_roll_ms before it (from the ring), so the first
+    #     syllable is not clipped
+    #   - it ends after hangover_ms of silence, or at max_phrase_s
+    #   - phrases with less than min_speech_ms of speech (clicks, coughs)
+    #     are dropped
+    # feed() returns the finished phrase as a view of an internal buffer,
+    # valid until the next feed().
+
+    def __init__(self, sample_rate, frame_samples, vad=None, pre_roll_ms=300, hangover_ms=400,
+                 min_speech_ms=150, max_phrase_s=4.0, onset_frames=2):
+        frame_ms = 1000 * frame_samples / sample_rate
+        self.sample_rate = sample_rate
+        self.frame_samples = frame_samples
+        self.vad = vad or EnergyVad()
+        self.onset_frames = onset_frames
+        self.hangover = max(1, round(hangover_ms / frame_ms))
+        self.min_speech = max(1, round(min_speech_ms / frame_ms))
+        self.ring = PcmRing(round(pre_roll_ms / frame_ms) + onset_frames, frame_samples)
+        self.phrase = np.zeros(max(int(max_phrase_s * sample_rate), self.ring.capacity * frame_samples), np.int16)
+
+        self.active = False
+        self.length = 0
+        self.onset = 0
+        self.speech = 0
+        self.silence = 0
+
+        # Counters
+        self.phrases = 0
+        self.dropped = 0
+
+    @classmethod
+    def from_settings(cls, settings, sample_rate, frame_samples):
+        return cls(sample_rate, frame_samples, EnergyVad(settings["voice_vad_ratio"]),
+                   pre_roll_ms=settings["voice_pre_roll_ms"], hangover_ms=settings["voice_hangover_ms"],
+                   max_phrase_s=settings["voice_max_phrase_s"])
+
+    def feed(self, frame):
+        speech = self.vad.is_speech(frame)
+        if not self.active:
+            self.ring.write(frame)
+            self.onset = self.onset + 1 if speech else 0
+            if self.onset >= self.onset_frames:
+                self.active = True
+                self.length = self.ring.copy_last(self.ring.capacity, self.phrase)
+                self.speech, self.silence = self.onset, 0
+            return None
+
+        fs = self.frame_samples
+        self.phrase[self.length:self.length + fs] = frame
+        self.length += fs
+        if speech:
+            self.speech += 1
+            self.silence = 0
+        else:
+            self.silence += 1
+        if self.silence >= self.hangover or self.length + fs > len(self.phrase):
+            return self._end()
+        return None
+
+    def _end(self):
+        self.active = False
+        self.onset = 0
+        self.ring.clear()
+        if self.speech < self.min_speech:
+            self.dropped += 1
+            return None
+        self.phrases += 1
+        return self.phrase[:self.length]
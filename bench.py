@@ -0,0 +1,123 @@
+# bench.py
+# Headless benchmark over recorded sessions. A recording with camera
+# frames runs the whole process_frame path (colour conversion, idle gate,
+# ROI, flow, MediaPipe, gestures) and needs MediaPipe; a landmarks-only
+# recording runs the gesture stage alone (process_landmarks), so its
+# numbers say nothing about capture or inference cost. The "path" column
+# says which one a row measured.
+#
+#   python bench.py                          # every recordings/*.avmrec
+#   python bench.py my_session.avmrec --repeat 10 --json results.json
+#   python bench.py --landmarks              # gesture stage only, even with frames
+#   python bench.py --make-baseline          # regenerate the synthetic baselines
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import tracemalloc
+from replay import Recording, ReplayDriver, write_synthetic
+
+RECORDINGS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recordings")
+BASELINE = os.path.join(RECORDINGS_DIR, "baseline_gestures.avmrec")
+BASELINE_FRAMES = os.path.join(RECORDINGS_DIR, "baseline_frames.avmrec")
+
+
+def _max_rss_mb():
+    try:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kB on Linux, bytes on macOS
+        return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+    except ImportError:
+        return None
+
+
+def bench_recording(path, repeat=5, use_frames=None, trace_memory=False):
+    recording = Recording(path)
+    if use_frames is None:
+        use_frames = recording.has_frames
+    wall, cpu, frames = [], [], 0
+    summary = None
+    peak = None
+
+    for i in range(repeat):
+        driver = ReplayDriver()
+        if trace_memory and i == 0:
+            tracemalloc.start()
+        w0, c0 = time.perf_counter(), time.process_time()
+        result = driver.run(recording, use_frames)
+        w1, c1 = time.perf_counter(), time.process_time()
+        if trace_memory and i == 0:
+            peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+            tracemalloc.stop()
+            continue    # tracing skews timing, keep it out of the numbers
+        wall.append(w1 - w0)
+        cpu.append(c1 - c0)
+        frames = result.frames
+        summary = result.summary()
+
+    best_wall, best_cpu = min(wall), min(cpu)
+    return {
+        "recording": os.path.basename(path),
+        "path": "full" if use_frames else "gestures",
+        "frames": frames,
+        "repeat": len(wall),
+        "fps": frames / best_wall if best_wall else None,
+        "wall_ms_per_frame": 1000 * best_wall / frames if frames else None,
+        "cpu_ms_per_frame": 1000 * best_cpu / frames if frames else None,
+        "peak_alloc_mb": peak,
+        "max_rss_mb": _max_rss_mb(),
+        "events": summary,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="AVM replay benchmark")
+    parser.add_argument("recordings", nargs="*", help="recordings to replay (default: recordings/*.avmrec)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--landmarks", action="store_true",
+                        help="replay stored landmarks (gesture stage only) even where frames exist")
+    parser.add_argument("--memory", action="store_true", help="extra traced run for peak allocations")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--make-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.make_baseline:
+        os.makedirs(RECORDINGS_DIR, exist_ok=True)
+        n = write_synthetic(BASELINE)
+        print(f"Wrote {n} frames to {BASELINE}")
+        n = write_synthetic(BASELINE_FRAMES, mode="both")
+        print(f"Wrote {n} frames to {BASELINE_FRAMES}")
+        return 0
+
+    paths = args.recordings or sorted(glob.glob(os.path.join(RECORDINGS_DIR, "*.avmrec")))
+    if not paths:
+        print("No recordings found")
+        return 1
+
+    results = []
+    print(f"{'recording':<28}{'path':>9}{'frames':>8}{'fps':>10}{'cpu ms/f':>10}{'peak MB':>9}")
+    for path in paths:
+        try:
+            r = bench_recording(path, max(args.repeat, 1) + (1 if args.memory else 0),
+                                False if args.landmarks else None, args.memory)
+        except ImportError as e:
+            # Frames need the hand model
+            print(f"{os.path.basename(path):<28}{'full':>9}  skipped: {e}")
+            continue
+        results.append(r)
+        peak = f"{r['peak_alloc_mb']:.2f}" if r["peak_alloc_mb"] is not None else "-"
+        print(f"{r['recording']:<28}{r['path']:>9}{r['frames']:>8}{r['fps']:>10.0f}"
+              f"{r['cpu_ms_per_frame']:>10.3f}{peak:>9}")
+        print(f"  events: {r['events']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
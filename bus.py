@@ -0,0 +1,493 @@
+# bus.py
+import argparse
+import os
+import selectors
+import socket
+import struct
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+import numpy as np
+from recording import LABELS, FLOATS_PER_HAND
+from metrics import now
+
+# Local publish / subscribe of what the pipeline sees, for other processes
+# on the same machine. Stream layout (little endian):
+#   server -> client: MAGIC, then batches:
+#     BATCH(size, count, dropped) + count records
+#     `dropped` is how many batches this subscriber lost to drop-oldest
+#     just before this one
+#   record: RECORD(t, kind, payload_len) + payload
+#     landmarks: LANDMARKS(seq, w, h, n_hands), n label ids (u8), then
+#                n * 21 * 3 float32 (x, y in pixels of the mirrored view,
+#                z scaled by width), as in recording.py
+#     gesture:   phase (u8, see PHASES) + gesture name (utf-8)
+#     cursor:    CURSOR(x, y) screen pixels
+#     status:    colour length (u8) + colour (any Qt colour string, e.g.
+#                "#ff0000" or "red") + text (utf-8)
+#   client -> server: one byte, the KIND_* bits it wants (0 = everything)
+# t is the frame's capture time on the perf_counter clock, which is the
+# same monotonic clock in every process on the machine: a subscriber gets
+# its delivery latency from time.perf_counter() - t.
+
+MAGIC = b"AVMBUS1\n"
+BATCH = struct.Struct("<IHI")
+RECORD = struct.Struct("<dBH")
+LANDMARKS = struct.Struct("<IHHB")
+CURSOR = struct.Struct("<ff")
+KIND_LANDMARKS, KIND_GESTURE, KIND_CURSOR, KIND_STATUS = 0, 1, 2, 3
+KINDS = {"landmarks": KIND_LANDMARKS, "gesture": KIND_GESTURE, "cursor": KIND_CURSOR, "status": KIND_STATUS}
+ALL_KINDS = 0xFF
+PHASES = ("enter", "fire", "exit")
+DEFAULT_PORT = 47800
+
+
+def default_address():
+    if hasattr(socket, "AF_UNIX"):
+        return os.path.join(tempfile.gettempdir(), "avm-bus.sock")
+    return f"127.0.0.1:{DEFAULT_PORT}"
+
+
+def _parse_address(address):
+    # "host:port" is TCP (Windows builds without AF_UNIX); anything else is
+    # a UNIX socket path
+    address = address or default_address()
+    host, _, port = address.rpartition(":")
+    if host and port.isdigit() and not any(sep in address for sep in "/\\"):
+        return socket.AF_INET, (host, int(port))
+    return socket.AF_UNIX, address
+
+
+def kind_mask(names):
+    mask = 0
+    for name in names:
+        mask |= 1 << KINDS[name]
+    return mask
+
+
+# --- SERVER ---
+
+class _Subscriber:
+    def __init__(self, sock, queue_len):
+        self.sock = sock
+        self.mask = ALL_KINDS
+        self.queue = deque(maxlen=queue_len)    # (body, count)
+        self.dropped = 0
+        self.out = memoryview(MAGIC)     # batch being written, may be partial
+        self.events = selectors.EVENT_READ | selectors.EVENT_WRITE
+
+
+class EventBus(threading.Thread):
+    # Publisher side. The vision loop adds records for a frame (landmarks,
+    # cursor, status and the gesture events the engine reported) and
+    # end_frame() packs them into one batch every batch_frames frames; this
+    # thread accepts subscribers and writes to them without blocking.
+    #   - every subscriber has its own queue of queue_len batches; a slow
+    #     one loses its oldest batches (counted, and reported to it in the
+    #     next batch header) and never holds up the loop or the others
+    #   - with no subscribers connected nothing is encoded at all
+
+    def __init__(self, address=None, queue_len=64, batch_frames=1):
+        super().__init__(daemon=True)
+        self.address = address or default_address()
+        self.queue_len = queue_len
+        self.batch_frames = batch_frames
+        self.running = False
+        self.failed = False     # address could not be bound
+
+        self.subscribers = []
+        self.server = None
+        self.selector = None
+        self._lock = threading.Lock()
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._woken = False
+
+        # Vision thread state
+        self._records = []      # (kind, packed record) not yet in a batch
+        self._frames = 0
+        self._seq = 0
+        self._cursor = None
+        self._status = None
+
+        # Counters
+        self.batches = 0
+        self.dropped = 0
+        self.disconnects = 0
+
+    @classmethod
+    def from_settings(cls, settings):
+        bus = cls(settings["bus_address"])
+        bus.configure(settings)
+        return bus
+
+    def configure(self, settings):
+        # Also applied live; the address needs a restart
+        self.queue_len = settings["bus_queue"]
+        self.batch_frames = max(1, settings["bus_batch_frames"])
+        with self._lock:
+            for sub in self.subscribers:
+                if sub.queue.maxlen != self.queue_len:
+                    sub.queue = deque(sub.queue, maxlen=self.queue_len)
+
+    def start(self):
+        family, addr = _parse_address(self.address)
+        try:
+            sock = socket.socket(family, socket.SOCK_STREAM)
+            if family == socket.AF_UNIX:
+                if os.path.exists(addr):
+                    os.unlink(addr)     # left behind by a crashed run
+            else:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind(addr)
+            sock.listen()
+        except OSError:
+            sock.close()
+            self.failed = True
+            return
+        sock.setblocking(False)
+        self.server = sock
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(sock, selectors.EVENT_READ)
+        self.selector.register(self._wake_r, selectors.EVENT_READ)
+        self.running = True
+        super().start()
+
+    def stop(self):
+        self.running = False
+        self._wake()
+        if self.is_alive():
+            self.join()
+        self._wake_r.close()
+        self._wake_w.close()
+
+    # Vision thread
+
+    def gesture(self, name, phase, t):
+        # GestureEngine listener
+        if self.subscribers:
+            payload = bytes([PHASES.index(phase)]) + name.encode()
+            self._add(KIND_GESTURE, t, payload)
+
+    def end_frame(self, t, hands, w, h, cursor, status):
+        if not self.subscribers:
+            self._records.clear()
+            self._cursor = self._status = None
+            return
+        n = hands.count
+        self._seq += 1
+        payload = LANDMARKS.pack(self._seq, w, h, n) + bytes(LABELS.index(label) for label in hands.labels[:n])
+        self._add(KIND_LANDMARKS, t, payload + hands.points[:n].astype("<f4").tobytes())
+        # Cursor and status only when they change
+        if cursor != self._cursor:
+            self._cursor = cursor
+            self._add(KIND_CURSOR, t, CURSOR.pack(*cursor))
+        if status != self._status:
+            self._status = status
+            text, color = status
+            color = color.encode()[:255]
+            self._add(KIND_STATUS, t, bytes([len(color)]) + color + text.encode())
+        self._frames += 1
+        if self._frames >= self.batch_frames:
+            self._frames = 0
+            self.flush()
+
+    def _add(self, kind, t, payload):
+        self._records.append((kind, RECORD.pack(t, kind, len(payload)) + payload))
+
+    def flush(self):
+        records, self._records = self._records, []
+        if not records:
+            return
+        bodies = {}     # one encoding per distinct subscription
+        with self._lock:
+            for sub in self.subscribers:
+                body = bodies.get(sub.mask)
+                if body is None:
+                    wanted = [r for kind, r in records if sub.mask & (1 << kind)]
+                    body = bodies[sub.mask] = (b"".join(wanted), len(wanted))
+                if not body[1]:
+                    continue
+                if len(sub.queue) == sub.queue.maxlen:
+                    sub.dropped += 1
+                    self.dropped += 1
+                sub.queue.append(body)
+        self.batches += 1
+        self._wake()
+
+    def _wake(self):
+        if not self._woken:
+            self._woken = True
+            try:
+                self._wake_w.send(b"\0")
+            except OSError:
+                pass
+
+    # Bus thread
+
+    def run(self):
+        try:
+            while self.running:
+                for key, events in self.selector.select(timeout=0.5):
+                    if key.fileobj is self.server:
+                        self._accept()
+                    elif key.fileobj is self._wake_r:
+                        self._wake_r.recv(4096)
+                        self._woken = False     # after the recv, so no wake-up is lost
+                    elif events & selectors.EVENT_READ:
+                        self._receive(key.data)
+                with self._lock:
+                    subscribers = list(self.subscribers)
+                for sub in subscribers:
+                    self._pump(sub)
+        finally:
+            self._close()
+
+    def _accept(self):
+        try:
+            sock, _ = self.server.accept()
+        except OSError:
+            return
+        sock.setblocking(False)
+        sub = _Subscriber(sock, self.queue_len)
+        self.selector.register(sock, sub.events, sub)
+        with self._lock:
+            self.subscribers.append(sub)
+
+    def _receive(self, sub):
+        try:
+            data = sub.sock.recv(64)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self._remove(sub)
+        elif data[-1]:
+            sub.mask = data[-1]
+
+    def _pump(self, sub):
+        # Writes queued batches until the socket would block
+        while True:
+            if sub.out is None:
+                with self._lock:
+                    if not sub.queue:
+                        break
+                    (body, count), dropped = sub.queue.popleft(), sub.dropped
+                    sub.dropped = 0
+                sub.out = memoryview(BATCH.pack(len(body), count, dropped) + body)
+            try:
+                sent = sub.sock.send(sub.out)
+            except BlockingIOError:
+                break
+            except OSError:
+                self._remove(sub)
+                return
+            sub.out = sub.out[sent:] if sent < len(sub.out) else None
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if sub.out is not None else 0)
+        if events != sub.events:
+            sub.events = events
+            self.selector.modify(sub.sock, events, sub)
+
+    def _remove(self, sub):
+        with self._lock:
+            if sub not in self.subscribers:
+                return
+            self.subscribers.remove(sub)
+        self.selector.unregister(sub.sock)
+        sub.sock.close()
+        self.disconnects += 1
+
+    def _close(self):
+        with self._lock:
+            subscribers, self.subscribers = self.subscribers, []
+        for sub in subscribers:
+            sub.sock.close()
+        self.selector.close()
+        self.server.close()
+        family, addr = _parse_address(self.address)
+        if family == socket.AF_UNIX and os.path.exists(addr):
+            os.unlink(addr)
+
+
+# --- CLIENT ---
+# Everything a subscriber needs; imports nothing from the pipeline.
+
+class Landmarks:
+    kind = KIND_LANDMARKS
+
+    def __init__(self, t, seq, w, h, labels, points):
+        self.t = t
+        self.seq = seq
+        self.w, self.h = w, h
+        self.labels = labels    # "Left" / "Right" per hand
+        self.points = points    # (n, 21, 3) float32, read-only
+
+
+class GestureEvent:
+    kind = KIND_GESTURE
+
+    def __init__(self, t, name, phase):
+        self.t = t
+        self.name = name
+        self.phase = phase      # "enter", "fire" or "exit"
+
+
+class Cursor:
+    kind = KIND_CURSOR
+
+    def __init__(self, t, x, y):
+        self.t = t
+        self.x, self.y = x, y
+
+
+class Status:
+    kind = KIND_STATUS
+
+    def __init__(self, t, text, color):
+        self.t = t
+        self.text = text
+        self.color = color
+
+
+def decode_batch(body, count):
+    messages = []
+    pos = 0
+    for _ in range(count):
+        t, kind, size = RECORD.unpack_from(body, pos)
+        pos += RECORD.size
+        payload = body[pos:pos + size]
+        pos += size
+        if kind == KIND_LANDMARKS:
+            seq, w, h, n = LANDMARKS.unpack_from(payload)
+            head = LANDMARKS.size
+            labels = [LABELS[i] for i in payload[head:head + n]]
+            points = np.frombuffer(payload, "<f4", n * FLOATS_PER_HAND, head + n).reshape(n, 21, 3)
+            messages.append(Landmarks(t, seq, w, h, labels, points))
+        elif kind == KIND_GESTURE:
+            messages.append(GestureEvent(t, payload[1:].decode(), PHASES[payload[0]]))
+        elif kind == KIND_CURSOR:
+            messages.append(Cursor(t, *CURSOR.unpack(payload)))
+        elif kind == KIND_STATUS:
+            n = payload[0]
+            messages.append(Status(t, payload[1 + n:].decode(), payload[1:1 + n].decode()))
+        # Unknown kinds (a newer publisher) are skipped
+    return messages
+
+
+class BusClient:
+    # Subscriber. read() returns (dropped, messages) for the next batch, or
+    # None when timeout passes first; iterating yields messages forever.
+    #   client = BusClient(kinds=("gesture", "cursor"))
+    #   for msg in client.connect(): ...
+
+    def __init__(self, address=None, kinds=None):
+        self.address = address or default_address()
+        self.mask = kind_mask(kinds) if kinds else ALL_KINDS
+        self.sock = None
+        self._buf = bytearray()
+
+        # Counters
+        self.batches = 0
+        self.dropped = 0
+
+    def connect(self, timeout=5.0):
+        family, addr = _parse_address(self.address)
+        self.sock = socket.socket(family, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(addr)
+        self.sock.sendall(bytes([self.mask]))
+        if not self._fill(len(MAGIC)) or bytes(self._buf[:len(MAGIC)]) != MAGIC:
+            self.close()
+            raise ConnectionError(f"{self.address} is not an AVM event bus")
+        del self._buf[:len(MAGIC)]
+        return self
+
+    def _fill(self, n):
+        # Reads until n bytes are buffered; False on timeout (what was read
+        # so far stays buffered for the next call)
+        while len(self._buf) < n:
+            try:
+                data = self.sock.recv(max(65536, n - len(self._buf)))
+            except socket.timeout:
+                return False
+            if not data:
+                raise ConnectionError("event bus closed")
+            self._buf += data
+        return True
+
+    def read(self, timeout=None):
+        self.sock.settimeout(timeout)
+        if not self._fill(BATCH.size):
+            return None
+        size, count, dropped = BATCH.unpack_from(self._buf)
+        if not self._fill(BATCH.size + size):
+            return None
+        body = bytes(self._buf[BATCH.size:BATCH.size + size])
+        del self._buf[:BATCH.size + size]
+        self.batches += 1
+        self.dropped += dropped
+        return dropped, decode_batch(body, count)
+
+    def __iter__(self):
+        while True:
+            for msg in self.read()[1]:
+                yield msg
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+
+# --- STAND-IN SUBSCRIBER ---
+
+def _describe(msg):
+    if msg.kind == KIND_LANDMARKS:
+        hands = " ".join(f"{label}@{p[8, 0]:.0f},{p[8, 1]:.0f}" for label, p in zip(msg.labels, msg.points))
+        return f"landmarks #{msg.seq} {msg.w}x{msg.h} {hands or '-'}"
+    if msg.kind == KIND_GESTURE:
+        return f"gesture {msg.name} {msg.phase}"
+    if msg.kind == KIND_CURSOR:
+        return f"cursor {msg.x:.0f},{msg.y:.0f}"
+    return f"status {msg.text!r} {msg.color}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Print what the AVM event bus publishes")
+    parser.add_argument("--address", help=f"bus address (default {default_address()})")
+    parser.add_argument("--kinds", default=",".join(KINDS), help="comma separated subset of: " + ", ".join(KINDS))
+    parser.add_argument("--count", type=int, help="exit after this many batches")
+    parser.add_argument("--slow", type=float, default=0.0, help="sleep this long per batch (drop-oldest test)")
+    args = parser.parse_args(argv)
+
+    client = BusClient(args.address, args.kinds.split(","))
+    try:
+        client.connect()
+    except OSError as e:
+        print(f"cannot connect to {client.address}: {e}", file=sys.stderr)
+        return 1
+    batches = 0
+    try:
+        while args.count is None or batches < args.count:
+            dropped, messages = client.read()
+            t = now()
+            if dropped:
+                print(f"-- {dropped} batches dropped")
+            for msg in messages:
+                print(f"{(t - msg.t) * 1000:6.1f} ms  {_describe(msg)}")
+            sys.stdout.flush()
+            batches += 1
+            if args.slow:
+                time.sleep(args.slow)
+    except (ConnectionError, KeyboardInterrupt):
+        pass
+    finally:
+        client.close()
+    print(f"{client.batches} batches, {client.dropped} dropped", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,403 @@
+# capture.py
+import argparse
+import sys
+import threading
+import time
+import cv2
+import numpy as np
+from metrics import now
+
+
+def _fourcc_str(value):
+    value = int(value)
+    return "".join(chr((value >> 8 * i) & 0xFF) for i in range(4)).strip("\x00")
+
+
+# --- FRAME SOURCES ---
+# Every source has open() -> bool, grab() -> bool, retrieve(dst) -> (ok, frame),
+# release() and describe(). grab/retrieve are split like cv2.VideoCapture so
+# the grabber can skip decoding frames it does not need; retrieve writes into
+# dst when it has the right shape.
+
+class CameraSource:
+    # OpenCV camera (V4L2 on Linux). With fourcc="auto" the formats are
+    # tried cheapest-to-decode first: uncompressed YUYV only needs a colour
+    # conversion, MJPG needs a JPEG decode per frame but fits higher
+    # resolutions/rates through USB 2. The first format the driver accepts
+    # at the requested size and rate wins.
+
+    FOURCCS = ("YUYV", "MJPG")
+
+    def __init__(self, index=0, width=640, height=480, fps=30, fourcc="auto", buffer_size=1):
+        self.index = index
+        self.width, self.height, self.fps = width, height, fps
+        self.fourcc = fourcc
+        self.buffer_size = buffer_size
+        self.cap = None
+        self.mode = None    # (fourcc, width, height, fps) actually in use
+
+    def _api(self):
+        return cv2.CAP_V4L2 if sys.platform.startswith("linux") else cv2.CAP_ANY
+
+    def _configure(self, fourcc):
+        cap = self.cap
+        if fourcc:
+            cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+        if self.width and self.height:
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        if self.fps:
+            cap.set(cv2.CAP_PROP_FPS, self.fps)
+        # Keep the driver queue as short as the backend allows
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, self.buffer_size)
+        self.mode = (_fourcc_str(cap.get(cv2.CAP_PROP_FOURCC)),
+                     int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                     cap.get(cv2.CAP_PROP_FPS))
+
+    def _accepted(self, fourcc):
+        got, w, h, fps = self.mode
+        return (got == fourcc and (not self.width or (w, h) == (self.width, self.height)) and
+                (not self.fps or fps + 0.5 >= self.fps))
+
+    def open(self):
+        self.cap = cv2.VideoCapture(self.index, self._api())
+        if not self.cap.isOpened():
+            return False
+        if self.fourcc != "auto":
+            self._configure(self.fourcc)
+            return True
+        for fourcc in self.FOURCCS:
+            self._configure(fourcc)
+            if self._accepted(fourcc):
+                return True
+        # Nothing matched exactly; keep whatever the driver settled on
+        self._configure(None)
+        return True
+
+    def grab(self):
+        return self.cap.grab()
+
+    def retrieve(self, dst=None):
+        return self.cap.retrieve(dst)
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+    def describe(self):
+        if self.mode is None:
+            return f"camera {self.index}"
+        fourcc, w, h, fps = self.mode
+        return f"camera {self.index} {fourcc} {w}x{h}@{fps:g}"
+
+
+class FileSource:
+    # Video file, paced to its own frame rate when realtime is set and
+    # looped at the end
+
+    def __init__(self, path, realtime=True, loop=True):
+        self.path = path
+        self.realtime = realtime
+        self.loop = loop
+        self.cap = None
+        self.interval = 0.0
+        self.next_t = 0.0
+
+    def open(self):
+        self.cap = cv2.VideoCapture(self.path)
+        if not self.cap.isOpened():
+            return False
+        fps = self.cap.get(cv2.CAP_PROP_FPS) or 30
+        self.interval = 1.0 / fps if self.realtime else 0.0
+        self.next_t = now()
+        return True
+
+    def grab(self):
+        if self.interval:
+            delay = self.next_t - now()
+            if delay > 0:
+                time.sleep(delay)
+            self.next_t = max(self.next_t + self.interval, now() - self.interval)
+        if self.cap.grab():
+            return True
+        if not self.loop:
+            return False
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        return self.cap.grab()
+
+    def retrieve(self, dst=None):
+        return self.cap.retrieve(dst)
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+    def describe(self):
+        return f"file {self.path}"
+
+
+class SyntheticSource:
+    # Generated frames for headless runs: a bright block sweeping over a
+    # fixed noise background, so both the motion detector and optical flow
+    # have something to look at
+
+    def __init__(self, width=640, height=480, fps=30, seed=0):
+        self.width, self.height, self.fps = width, height, fps
+        self.seed = seed
+        self.background = None
+        self.n = 0
+        self.next_t = 0.0
+
+    def open(self):
+        rng = np.random.default_rng(self.seed)
+        noise = rng.integers(0, 256, (self.height // 8, self.width // 8, 3), dtype=np.uint8)
+        self.background = cv2.resize(noise, (self.width, self.height), interpolation=cv2.INTER_LINEAR)
+        self.next_t = now()
+        return True
+
+    def grab(self):
+        if self.fps:
+            delay = self.next_t - now()
+            if delay > 0:
+                time.sleep(delay)
+            self.next_t = max(self.next_t + 1.0 / self.fps, now() - 1.0 / self.fps)
+        self.n += 1
+        return True
+
+    def retrieve(self, dst=None):
+        frame = dst if dst is not None and dst.shape == self.background.shape else np.empty_like(self.background)
+        frame[:] = self.background
+        side = self.height // 4
+        x = int((self.n * 4) % (self.width - side))
+        y = int((self.height - side) / 2 * (1 + np.sin(self.n / 20)))
+        frame[y:y + side, x:x + side] = 230
+        return True, frame
+
+    def release(self):
+        self.background = None
+
+    def describe(self):
+        return f"synthetic {self.width}x{self.height}@{self.fps}"
+
+
+# --- PROBE ---
+
+PROBE_MODES = ((640, 480, 30), (640, 480, 60), (1280, 720, 30), (1920, 1080, 30))
+
+
+def probe_camera(index=0, modes=PROBE_MODES, fourccs=CameraSource.FOURCCS, frames=30):
+    # Opens the camera once per (fourcc, mode) and measures what it really
+    # delivers. Returns dicts sorted by decode cost among the modes that
+    # kept up with the requested rate.
+    results = []
+    for fourcc in fourccs:
+        for w, h, fps in modes:
+            src = CameraSource(index, w, h, fps, fourcc)
+            if not src.open():
+                src.release()
+                return results
+            got, gw, gh, _ = src.mode
+            if got != fourcc or (gw, gh) != (w, h):
+                src.release()
+                continue
+            src.grab()      # first frame includes stream start-up
+            decode, t0 = 0.0, now()
+            n = 0
+            for _ in range(frames):
+                if not src.grab():
+                    break
+                t1 = now()
+                ok, _ = src.retrieve()
+                decode += now() - t1
+                n += ok
+            elapsed = now() - t0
+            src.release()
+            if n:
+                results.append({"fourcc": fourcc, "width": w, "height": h, "requested_fps": fps,
+                                "measured_fps": n / elapsed, "decode_ms": 1000 * decode / n})
+    results.sort(key=lambda r: (r["measured_fps"] < 0.9 * r["requested_fps"], r["decode_ms"]))
+    return results
+
+
+def format_probe(results):
+    if not results:
+        return ["No usable camera modes"]
+    lines = [f"{'format':<8}{'mode':>14}{'fps':>8}{'decode ms':>11}"]
+    for r in results:
+        mode = f"{r['width']}x{r['height']}@{r['requested_fps']}"
+        lines.append(f"{r['fourcc']:<8}{mode:>14}{r['measured_fps']:>8.1f}{r['decode_ms']:>11.2f}")
+    return lines
+
+
+def best_mode(results, width, height, fps):
+    # Cheapest probed format for the requested mode, or None
+    for r in results:
+        if (r["width"], r["height"]) == (width, height) and r["measured_fps"] >= 0.9 * fps:
+            return r["fourcc"]
+    return None
+
+
+def make_source(settings):
+    kind = settings["capture_source"]
+    w, h, fps = settings["capture_width"], settings["capture_height"], settings["capture_fps"]
+    if kind == "file":
+        return FileSource(settings["capture_path"])
+    if kind == "synthetic":
+        return SyntheticSource(w, h, fps)
+
+    fourcc = settings["capture_fourcc"]
+    if settings["capture_probe"]:
+        # Slow (opens the camera once per mode), so only on request
+        results = probe_camera(settings["capture_index"])
+        print("\n".join(format_probe(results)))
+        fourcc = best_mode(results, w, h, fps) or fourcc
+    return CameraSource(settings["capture_index"], w, h, fps, fourcc, settings["capture_buffer"])
+
+
+class FrameGrabber(threading.Thread):
+    # Reads a frame source on its own thread into a single slot. The
+    # consumer always gets the newest frame; anything it never picked up is
+    # counted as dropped instead of piling up in the driver buffer.
+    #
+    # max_fps > 0 limits how many frames are decoded: every frame is still
+    # grabbed (cheap, keeps the driver queue fresh) but only retrieved at
+    # that rate. Setting it back to 0 takes effect on the next frame.
+    #
+    # After max_failures reads in a row fail the source is closed and
+    # reopened, waiting backoff seconds first (doubling up to max_backoff).
+    #
+    # Frames are decoded into three reusable buffers: the newest one, the
+    # one the consumer holds (valid until its next read()) and the one being
+    # written.
+
+    def __init__(self, source=0, metrics=None, max_failures=10, backoff=0.5, max_backoff=8.0):
+        super().__init__(daemon=True)
+        self.source = CameraSource(source) if isinstance(source, int) else source
+        self.metrics = metrics
+        self.max_failures = max_failures
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.running = False
+        self.max_fps = 0
+        self._last_decode = -1e9
+
+        self._cond = threading.Condition()
+        self._stop_event = threading.Event()
+        self._latest = None   # (frame, t_capture, seq)
+        self._seq = 0
+        self._taken_seq = 0
+        self._buffers = [None, None, None]
+        self._latest_i = self._taken_i = None
+
+        # Counters
+        self.frames_captured = 0
+        self.frames_dropped = 0
+        self.frames_skipped = 0
+        self.read_failures = 0
+        self.reconnects = 0
+        self.allocations = 0
+
+    def start(self):
+        self.running = True
+        super().start()
+
+    def _connect(self):
+        # Opens the source, backing off between attempts; False once stopped
+        delay = self.backoff
+        while self.running:
+            if self.source.open():
+                print(f"Capture: {self.source.describe()}")
+                return True
+            self.source.release()
+            print(f"Capture: cannot open {self.source.describe()}, retrying in {delay:g}s")
+            if self._stop_event.wait(delay):
+                return False
+            delay = min(delay * 2, self.max_backoff)
+        return False
+
+    def run(self):
+        if not self._connect():
+            return
+        failures = 0
+
+        while self.running:
+            t_start = now()
+            ret = self.source.grab()
+            t_capture = now()
+            if ret and self.max_fps > 0 and t_capture - self._last_decode < 1.0 / self.max_fps:
+                self.frames_skipped += 1
+                continue
+            if ret:
+                with self._cond:
+                    i = next(k for k in range(3) if k != self._latest_i and k != self._taken_i)
+                buf = self._buffers[i]
+                ret, frame = self.source.retrieve(buf)
+                if ret and frame is not buf:
+                    self._buffers[i] = frame
+                    self.allocations += 1
+            if not ret:
+                self.read_failures += 1
+                failures += 1
+                if failures >= self.max_failures:
+                    self.source.release()
+                    self.reconnects += 1
+                    if not self._connect():
+                        break
+                    failures = 0
+                else:
+                    self._stop_event.wait(0.01 * failures)
+                continue
+            failures = 0
+            self._last_decode = t_capture
+
+            with self._cond:
+                self._seq += 1
+                self._latest = (frame, t_capture, self._seq)
+                self._latest_i = i
+                self.frames_captured += 1
+                self._cond.notify_all()
+            if self.metrics:
+                self.metrics.record("capture", now() - t_start)
+
+        self.source.release()
+        with self._cond:
+            self._cond.notify_all()
+
+    def read(self, timeout=1.0):
+        # Returns (frame, t_capture, seq) for the newest unseen frame,
+        # or None if nothing new arrived within timeout. The frame buffer
+        # is reused after the next read().
+        with self._cond:
+            if self._seq == self._taken_seq:
+                self._cond.wait_for(lambda: self._seq != self._taken_seq or not self.running, timeout)
+            if self._latest is None or self._seq == self._taken_seq:
+                return None
+
+            frame, t_capture, seq = self._latest
+            self.frames_dropped += seq - self._taken_seq - 1
+            self._taken_seq = seq
+            self._taken_i = self._latest_i
+            return frame, t_capture, seq
+
+    def stop(self):
+        self.running = False
+        self._stop_event.set()
+        with self._cond:
+            self._cond.notify_all()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Probe camera modes")
+    parser.add_argument("--index", type=int, default=0)
+    parser.add_argument("--frames", type=int, default=30)
+    args = parser.parse_args(argv)
+
+    results = probe_camera(args.index, frames=args.frames)
+    print("\n".join(format_probe(results)))
+    return 0 if results else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
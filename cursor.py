@@ -0,0 +1,238 @@
+# cursor.py
+import sys
+import threading
+import time
+from metrics import now
+
+
+# --- SCREEN MAPPING ---
+
+def list_monitors():
+    # [(left, top, width, height), ...] with the primary monitor first
+    if sys.platform == "win32":
+        try:
+            import ctypes
+            from ctypes import wintypes
+            monitors = []
+
+            class MONITORINFO(ctypes.Structure):
+                _fields_ = [("cbSize", wintypes.DWORD), ("rcMonitor", wintypes.RECT),
+                            ("rcWork", wintypes.RECT), ("dwFlags", wintypes.DWORD)]
+
+            proc_type = ctypes.WINFUNCTYPE(ctypes.c_int, wintypes.HMONITOR, wintypes.HDC,
+                                           ctypes.POINTER(wintypes.RECT), wintypes.LPARAM)
+
+            def on_monitor(hmon, hdc, rect, lparam):
+                info = MONITORINFO()
+                info.cbSize = ctypes.sizeof(MONITORINFO)
+                ctypes.windll.user32.GetMonitorInfoW(hmon, ctypes.byref(info))
+                r = info.rcMonitor
+                entry = (r.left, r.top, r.right - r.left, r.bottom - r.top)
+                # MONITORINFOF_PRIMARY = 1
+                if info.dwFlags & 1:
+                    monitors.insert(0, entry)
+                else:
+                    monitors.append(entry)
+                return 1
+
+            ctypes.windll.user32.EnumDisplayMonitors(None, None, proc_type(on_monitor), 0)
+            if monitors:
+                return monitors
+        except Exception:
+            pass
+
+    import pyautogui
+    w, h = pyautogui.size()
+    return [(0, 0, w, h)]
+
+
+class ScreenMapper:
+    # Affine camera -> screen transform, precomputed once per frame size:
+    #   sx = ax * x + bx,  sy = ay * y + by
+    # The active camera area is the frame minus a frame_r margin, so the
+    # hand does not have to reach the image border to reach the screen edge.
+
+    def __init__(self, monitor="all", frame_r=100, monitors=None):
+        self.frame_r = frame_r
+        self.monitors = monitors if monitors is not None else list_monitors()
+        self.select(monitor)
+
+    def select(self, monitor):
+        # "all" or a monitor index; anything else means "all"
+        try:
+            self.rect = None if monitor == "all" else self.monitors[int(monitor) % len(self.monitors)]
+        except (TypeError, ValueError):
+            self.rect = None
+        if self.rect is None:
+            # Bounding box of the whole virtual desktop
+            left = min(m[0] for m in self.monitors)
+            top = min(m[1] for m in self.monitors)
+            right = max(m[0] + m[2] for m in self.monitors)
+            bottom = max(m[1] + m[3] for m in self.monitors)
+            self.rect = (left, top, right - left, bottom - top)
+        left, top, sw, sh = self.rect
+        self.min_x, self.max_x = left, left + sw - 1
+        self.min_y, self.max_y = top, top + sh - 1
+        self._size = None
+
+    def _prepare(self, w, h):
+        left, top, sw, sh = self.rect
+        r = self.frame_r
+        self.ax = sw / max(w - 2 * r, 1)
+        self.bx = left - r * self.ax
+        self.ay = sh / max(h - 2 * r, 1)
+        self.by = top - r * self.ay
+        self._size = (w, h)
+
+    def map(self, x, y, w, h):
+        if self._size != (w, h):
+            self._prepare(w, h)
+        return self.clamp(self.ax * x + self.bx, self.ay * y + self.by)
+
+    def clamp(self, x, y):
+        return (min(max(x, self.min_x), self.max_x),
+                min(max(y, self.min_y), self.max_y))
+
+
+# --- OUTPUT ENGINE ---
+
+class CursorEngine(threading.Thread):
+    # Upsamples camera-rate cursor targets to rate_hz moves.
+    #   "interpolate" - render one sample interval in the past, always
+    #                   between two real samples (smoothest)
+    #   "extrapolate" - continue the last velocity for up to max_horizon
+    #                   (no added latency)
+    # settle() stops the stream and places the cursor exactly, so a click or
+    # a drag start/end lands on the last real target.
+
+    def __init__(self, input_dispatcher, rate_hz=144, mode="extrapolate", max_horizon=0.05, clamp=None):
+        super().__init__(daemon=True)
+        self.input = input_dispatcher
+        self.clamp = clamp
+        self.rate_hz = rate_hz
+        self.mode = mode
+        self.max_horizon = max_horizon
+        self.running = False
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._prev = None     # (t, x, y)
+        self._last = None
+        self._offset = None   # arrival time - capture time, smoothed
+        self._interval = 1 / 30
+        self._active = False
+        self._emitted = None
+
+        # Counters
+        self.samples_in = 0
+        self.moves_out = 0
+
+    def start(self):
+        # rate_hz <= 0 turns the engine into a pass-through
+        if self.rate_hz > 0:
+            self.running = True
+            super().start()
+
+    def submit(self, x, y, t_capture):
+        if not self.running:
+            self.input.move(x, y, t_capture)
+            return
+        t_now = now()
+        with self._lock:
+            if self._last is not None and t_capture > self._last[0]:
+                self._interval += ((t_capture - self._last[0]) - self._interval) * 0.2
+            self._prev, self._last = self._last, (t_capture, x, y)
+            delay = t_now - t_capture
+            if self._offset is None:
+                self._offset = delay
+            else:
+                self._offset += (delay - self._offset) * 0.1
+            self._active = True
+            self.samples_in += 1
+        self._wake.set()
+
+    def settle(self, x=None, y=None):
+        # Called from the gesture loop right before posting a click or a
+        # mouse down/up. Holding the lock means no tick can slip a move in
+        # after the exact placement.
+        with self._lock:
+            self._active = False
+            if x is None and self._last is not None:
+                x, y = self._last[1], self._last[2]
+            if x is not None:
+                self.input.move(x, y, self._last[0] if self._last else None)
+                self._emitted = (x, y)
+            # Restart the sample history so the next stroke does not
+            # extrapolate from the old one
+            self._prev = None
+            self._last = None
+
+    def _sample(self, t_now):
+        if self._last is None:
+            return None
+        t1, x1, y1 = self._last
+        s = t_now - self._offset
+        if self._prev is None:
+            return x1, y1
+
+        t0, x0, y0 = self._prev
+        span = t1 - t0
+        if span <= 0:
+            return x1, y1
+
+        if self.mode == "interpolate":
+            s -= self._interval
+            u = min(max((s - t0) / span, 0.0), 1.0)
+        else:
+            u = 1.0 + min(max(s - t1, 0.0), self.max_horizon) / span
+        return x0 + (x1 - x0) * u, y0 + (y1 - y0) * u
+
+    def run(self):
+        timer_res = _fine_timer()
+        period = 1.0 / self.rate_hz
+        next_tick = now()
+        while self.running:
+            if not self._active:
+                self._wake.wait(0.25)
+                self._wake.clear()
+                next_tick = now()
+                continue
+
+            with self._lock:
+                if self._active:
+                    pt = self._sample(now())
+                    if pt is not None and self.clamp:
+                        pt = self.clamp(*pt)
+                    if pt is not None and (self._emitted is None or
+                                           abs(pt[0] - self._emitted[0]) >= 0.5 or
+                                           abs(pt[1] - self._emitted[1]) >= 0.5):
+                        self.input.move(pt[0], pt[1], self._last[0])
+                        self._emitted = pt
+                        self.moves_out += 1
+
+            next_tick += period
+            delay = next_tick - now()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_tick = now()
+        if timer_res:
+            timer_res()
+
+    def stop(self):
+        self.running = False
+        self._wake.set()
+
+
+def _fine_timer():
+    # Windows sleeps in ~15 ms steps unless the timer resolution is raised.
+    # Returns a callable that restores it, or None.
+    if sys.platform != "win32":
+        return None
+    try:
+        import ctypes
+        winmm = ctypes.windll.winmm
+        winmm.timeBeginPeriod(1)
+        return lambda: winmm.timeEndPeriod(1)
+    except Exception:
+        return None
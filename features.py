@@ -0,0 +1,119 @@
+# features.py
+import numpy as np
+
+# Finger order used everywhere: thumb, index, middle, ring, little
+THUMB, INDEX, MIDDLE, RING, LITTLE = range(5)
+TIP_IDS = np.array([4, 8, 12, 16, 20])
+PIP_IDS = np.array([3, 6, 10, 14, 18])   # joint a tip must rise above to count as "up"
+MASK_BITS = np.array([16, 8, 4, 2, 1], np.int32)
+
+WRIST, MIDDLE_MCP = 0, 9
+MIRRORED_LABEL = {"Left": "Right", "Right": "Left"}
+
+
+class HandLandmarks:
+    # Preallocated (max_hands, 21, 3) float32 buffer. x and y are in frame
+    # pixels, z is MediaPipe's relative depth scaled by the frame width.
+    # Nothing is rounded, so sub-pixel motion survives to the filters.
+
+    def __init__(self, max_hands=2):
+        self.max_hands = max_hands
+        self.points = np.zeros((max_hands, 21, 3), np.float32)
+        self.labels = [None] * max_hands
+        self.count = 0
+        self._scale = np.ones(3, np.float32)
+
+    def load_mediapipe(self, results, w, h, roi=None):
+        # roi: (x0, y0, x1, y1) when the model only saw that crop of the frame
+        self.count = 0
+        if not results.multi_hand_landmarks:
+            return self
+        for landmarks, handedness in zip(results.multi_hand_landmarks, results.multi_handedness):
+            if self.count == self.max_hands:
+                break
+            self.points[self.count] = [(lm.x, lm.y, lm.z) for lm in landmarks.landmark]
+            self.labels[self.count] = handedness.classification[0].label
+            self.count += 1
+        if roi is None:
+            self._scale[:] = (w, h, w)
+            self.points[:self.count] *= self._scale
+        else:
+            x0, y0, x1, y1 = roi
+            self._scale[:] = (x1 - x0, y1 - y0, x1 - x0)
+            self.points[:self.count] *= self._scale
+            self.points[:self.count, :, 0] += x0
+            self.points[:self.count, :, 1] += y0
+        return self
+
+    def load(self, points, labels):
+        # From an already decoded (n, 21, 3) pixel array (replays, trackers)
+        n = min(len(points), self.max_hands)
+        self.points[:n] = points[:n]
+        self.labels[:n] = labels[:n]
+        self.count = n
+        return self
+
+    def mirror_from(self, src, w):
+        # Copy of src flipped left-right, as if the frame had been mirrored.
+        # MediaPipe assumes a mirrored (selfie) image when naming hands, so
+        # the labels swap too.
+        n = src.count
+        self.points[:n] = src.points[:n]
+        self.points[:n, :, 0] = w - src.points[:n, :, 0]
+        for i in range(n):
+            self.labels[i] = MIRRORED_LABEL.get(src.labels[i], src.labels[i])
+        self.count = n
+        return self
+
+    def find(self, label):
+        for i in range(self.count):
+            if self.labels[i] == label:
+                return i
+        return 0 if self.count else None
+
+
+class FrameFeatures:
+    # Every per-frame quantity the gestures use, computed in one vectorized
+    # pass over the landmark buffer:
+    #   fingers    (hands, 5) bool, finger up
+    #   masks      (hands,) int, fingers packed to 5 bits (thumb = 16)
+    #   tip_dist   (hands, 5, 5) pairwise fingertip distances in pixels
+    #   scale      (hands,) wrist to middle knuckle length
+    #   wrist_dist distance between the two wrists (0 with one hand)
+    #   index_dist distance between the two index tips (0 with one hand)
+
+    def __init__(self, max_hands=2):
+        self.fingers = np.zeros((max_hands, 5), bool)
+        self.masks = np.zeros(max_hands, np.int32)
+        self.tip_dist = np.zeros((max_hands, 5, 5), np.float32)
+        self.scale = np.zeros(max_hands, np.float32)
+        self.wrist_dist = 0.0
+        self.index_dist = 0.0
+        self.count = 0
+        self._diff = np.zeros((max_hands, 5, 5, 2), np.float32)
+
+    def compute(self, hands):
+        n = self.count = hands.count
+        if n == 0:
+            self.wrist_dist = self.index_dist = 0.0
+            return self
+
+        xy = hands.points[:n, :, :2]
+        tips = xy[:, TIP_IDS]
+
+        np.less(tips[:, :, 1], xy[:, PIP_IDS, 1], out=self.fingers[:n])
+        np.dot(self.fingers[:n], MASK_BITS, out=self.masks[:n])
+
+        diff = self._diff[:n]
+        np.subtract(tips[:, :, None, :], tips[:, None, :, :], out=diff)
+        np.hypot(diff[..., 0], diff[..., 1], out=self.tip_dist[:n])
+
+        d = xy[:, WRIST] - xy[:, MIDDLE_MCP]
+        np.hypot(d[:, 0], d[:, 1], out=self.scale[:n])
+
+        if n >= 2:
+            d = xy[0, [WRIST, TIP_IDS[INDEX]]] - xy[1, [WRIST, TIP_IDS[INDEX]]]
+            self.wrist_dist, self.index_dist = np.hypot(d[:, 0], d[:, 1]).tolist()
+        else:
+            self.wrist_dist = self.index_dist = 0.0
+        return self
@@ -0,0 +1,185 @@
+# filters.py
+import math
+from metrics import now
+
+
+class ExponentialFilter:
+    # The old fixed smoothing: move a fraction alpha towards the target.
+    def __init__(self, alpha=0.2):
+        self.alpha = alpha
+        self.x = None
+
+    def reset(self):
+        self.x = None
+
+    def __call__(self, x, t):
+        if self.x is None:
+            self.x = x
+        else:
+            self.x += (x - self.x) * self.alpha
+        return self.x
+
+
+class OneEuroFilter:
+    # Casiez et al. 2012. Cutoff rises with speed: heavy smoothing while the
+    # hand is still, little lag while it moves.
+    def __init__(self, min_cutoff=1.0, beta=0.007, d_cutoff=1.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def reset(self):
+        self.x = None
+        self.dx = 0.0
+        self.t = None
+
+    @staticmethod
+    def _alpha(cutoff, dt):
+        tau = 1.0 / (2 * math.pi * cutoff)
+        return 1.0 / (1.0 + tau / dt)
+
+    def __call__(self, x, t):
+        if self.x is None or t <= self.t:
+            self.x, self.t = x, t
+            return x
+
+        dt = t - self.t
+        dx = (x - self.x) / dt
+        a_d = self._alpha(self.d_cutoff, dt)
+        self.dx += a_d * (dx - self.dx)
+
+        cutoff = self.min_cutoff + self.beta * abs(self.dx)
+        a = self._alpha(cutoff, dt)
+        self.x += a * (x - self.x)
+        self.t = t
+        return self.x
+
+
+class KalmanPredictor:
+    # 1D constant-velocity Kalman filter. Besides smoothing it keeps a
+    # velocity estimate so the output can be projected ahead in time.
+    def __init__(self, process_noise=5000.0, measurement_noise=4.0):
+        self.q = process_noise
+        self.r = measurement_noise
+        self.reset()
+
+    def reset(self):
+        self.x = None
+        self.v = 0.0
+        self.t = None
+        self.p = [[1e3, 0.0], [0.0, 1e3]]
+
+    def __call__(self, z, t, lead=0.0):
+        if self.x is None or t <= self.t:
+            self.x, self.v, self.t = z, 0.0, t
+            return z
+
+        dt = t - self.t
+        self.t = t
+
+        # Predict
+        x = self.x + self.v * dt
+        p00, p01 = self.p[0]
+        p10, p11 = self.p[1]
+        q = self.q
+        p00 = p00 + dt * (p10 + p01) + dt * dt * p11 + q * dt ** 4 / 4
+        p01 = p01 + dt * p11 + q * dt ** 3 / 2
+        p10 = p10 + dt * p11 + q * dt ** 3 / 2
+        p11 = p11 + q * dt * dt
+
+        # Update
+        s = p00 + self.r
+        k0, k1 = p00 / s, p10 / s
+        y = z - x
+        self.x = x + k0 * y
+        self.v = self.v + k1 * y
+        self.p = [[(1 - k0) * p00, (1 - k0) * p01],
+                  [p10 - k1 * p00, p11 - k1 * p01]]
+
+        return self.x + self.v * lead
+
+
+class CursorFilter:
+    # 2D filter stage used by the move and drag paths.
+    #   "exp"      - old behaviour, one smoothing knob (smoothing_alpha,
+    #                or 1 / smoothing_level while that is null)
+    #   "one_euro" - speed adaptive smoothing; smoothing_level scales
+    #                one_euro_min_cutoff, smoothing_alpha does not apply
+    #   "kalman"   - constant-velocity Kalman only
+    # With predict on, a Kalman predictor runs after the smoother and pushes
+    # the output ahead by the measured capture-to-now latency.
+
+    RESET_GAP = 0.5  # seconds without samples before starting fresh
+
+    def __init__(self, kind="one_euro", predict=True, smoothing_alpha=None,
+                 min_cutoff=1.0, beta=0.007, max_lead=0.08, clock=now):
+        self.kind = kind
+        self.clock = clock
+        self.predict = predict
+        self.base_alpha = smoothing_alpha      # None = follow the slider
+        self.level = 5
+        self.base_min_cutoff = min_cutoff
+        self.beta = beta
+        self.max_lead = max_lead
+        self.latency = 0.0
+        self.last_t = None
+        self._build()
+
+    @classmethod
+    def from_settings(cls, settings, clock=now):
+        f = cls(clock=clock)
+        f.configure(settings)
+        return f
+
+    def configure(self, settings):
+        # Also applied live (settings.SettingsStore); the filters start
+        # fresh from the next sample
+        self.kind = settings["cursor_filter"]
+        self.predict = settings["cursor_predict"]
+        self.base_alpha = settings["smoothing_alpha"]
+        self.base_min_cutoff = settings["one_euro_min_cutoff"]
+        self.beta = settings["one_euro_beta"]
+        self.max_lead = settings["predict_max_lead"]
+        self.level = max(1, settings["smoothing_level"])
+        self._build()
+
+    def _alpha(self):
+        # smoothing_alpha wins when set; otherwise the slider's old divisor
+        return self.base_alpha if self.base_alpha is not None else 1.0 / self.level
+
+    def _build(self):
+        if self.kind == "exp":
+            self.smooth = [ExponentialFilter(self._alpha()) for _ in range(2)]
+        elif self.kind == "one_euro":
+            self.smooth = [OneEuroFilter(self.base_min_cutoff * 5.0 / self.level, self.beta) for _ in range(2)]
+        else:
+            self.smooth = None
+        use_kalman = self.predict or self.kind == "kalman"
+        self.kalman = [KalmanPredictor() for _ in range(2)] if use_kalman else None
+
+    def reset(self):
+        for stage in (self.smooth, self.kalman):
+            if stage:
+                for f in stage:
+                    f.reset()
+        self.last_t = None
+
+    def update(self, x, y, t_capture):
+        if self.last_t is not None and t_capture - self.last_t > self.RESET_GAP:
+            self.reset()
+        self.last_t = t_capture
+
+        if self.smooth:
+            x = self.smooth[0](x, t_capture)
+            y = self.smooth[1](y, t_capture)
+
+        if self.kalman:
+            # Running estimate of how old the sample is by the time we use it
+            age = self.clock() - t_capture
+            self.latency += (age - self.latency) * 0.1
+            lead = min(max(self.latency, 0.0), self.max_lead) if self.predict else 0.0
+            x = self.kalman[0](x, t_capture, lead)
+            y = self.kalman[1](y, t_capture, lead)
+
+        return x, y
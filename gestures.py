@@ -0,0 +1,355 @@
+# gestures.py
+import math
+from features import THUMB, INDEX, MIDDLE, TIP_IDS, MIDDLE_MCP
+from status import UiEvent
+
+
+# --- FINGER MASKS ---
+# Finger states are packed into 5 bits: thumb, index, middle, ring, little
+# (thumb is the highest bit, see features.MASK_BITS). Gestures declare the
+# poses they accept as patterns like "x1110", where x means "either".
+
+def expand_pattern(pattern):
+    masks = [0]
+    for ch in pattern:
+        if ch == "x":
+            masks = [m << 1 for m in masks] + [(m << 1) | 1 for m in masks]
+        else:
+            masks = [(m << 1) | int(ch) for m in masks]
+    return masks
+
+
+class GestureFrame:
+    # Everything a gesture needs to know about one processed frame. All
+    # geometry comes from the FrameFeatures pass; this only picks the
+    # target hand.
+
+    def __init__(self, hands, features, t, w, h, overlay=None, active_label="Right"):
+        self.hands = hands
+        self.features = features
+        self.count = features.count
+        self.t = t
+        self.w, self.h = w, h
+        self.overlay = overlay      # overlay.Overlay when this frame is previewed
+        self.status = None
+        self.event = None           # one-off status from an on_exit ("CLICK", "Dropped")
+
+        self.target = hands.find(active_label)
+        if self.target is None:
+            self.label, self.lm, self.mask = None, None, None
+        else:
+            self.label = hands.labels[self.target]
+            self.lm = hands.points[self.target]
+            self.mask = int(features.masks[self.target])
+
+    def tip_dist(self, a, b):
+        return self.features.tip_dist[self.target, a, b]
+
+
+class Gesture:
+    # One entry in the registry.
+    #   channel   gestures on the same channel are exclusive (first match
+    #             wins); different channels run side by side
+    #   hands     hands required in view
+    #   pattern   accepted finger poses of the target hand ("x" = either)
+    #   when      extra predicate, when(frame) -> bool
+    #   flag      key in the worker's gesture flags that enables it
+    #   debounce  pose must hold this long before the gesture activates
+    #   linger    stay active this long when the hand briefly disappears
+    #   cooldown  minimum time between two fires
+    #   repeat    re-fire every `repeat` seconds while held (None = once)
+    #   status    (text, color) shown while active
+    # Callbacks take (host, frame); on_exit also gets the time held.
+
+    def __init__(self, name, channel="hand", hands=1, pattern="xxxxx", when=None, flag=None,
+                 debounce=0.0, linger=0.0, cooldown=0.0, repeat=None, status=None,
+                 on_enter=None, on_fire=None, on_frame=None, on_exit=None):
+        self.name = name
+        self.channel = channel
+        self.hands = hands
+        self.pattern = pattern
+        self.masks = expand_pattern(pattern)
+        self.when = when
+        self.flag = flag
+        self.debounce = debounce
+        self.linger = linger
+        self.cooldown = cooldown
+        self.repeat = repeat
+        self.status = status
+        self.on_enter = on_enter
+        self.on_fire = on_fire
+        self.on_frame = on_frame
+        self.on_exit = on_exit
+
+    def accepts(self, mask):
+        return mask is not None and mask in self.masks
+
+
+class _Channel:
+    def __init__(self, name):
+        self.name = name
+        self.table = [() for _ in range(32)]
+        self.hands = 2
+        self.active = None
+        self.entered_at = 0.0
+        self.candidate = None
+        self.candidate_since = 0.0
+        self.lost_since = None
+
+
+class GestureEngine:
+    # Per frame each channel looks up its candidates by finger mask (a
+    # 32-entry table), takes the first enabled one whose predicate holds and
+    # runs the enter / fire / frame / exit callbacks. All timing uses the
+    # capture timestamp carried by the frame, so behaviour does not depend
+    # on the frame rate.
+
+    def __init__(self, host, flags):
+        self.host = host
+        self.flags = flags
+        self.channels = {}
+        self.gestures = {}
+        self.last_fire = {}
+        self.solo = None    # only this channel is evaluated (sleep mode)
+        self.listener = None    # listener(name, phase, t), phase "enter" / "fire" / "exit"
+
+    def register(self, gesture):
+        ch = self.channels.get(gesture.channel)
+        if ch is None:
+            ch = self.channels[gesture.channel] = _Channel(gesture.channel)
+        ch.hands = min(ch.hands, gesture.hands)
+        for m in gesture.masks:
+            ch.table[m] = ch.table[m] + (gesture,)
+        self.gestures[gesture.name] = gesture
+        self.last_fire[gesture.name] = -math.inf
+
+    def active(self, channel="hand"):
+        ch = self.channels.get(channel)
+        return ch.active.name if ch and ch.active else None
+
+    def update(self, frame):
+        for ch in self.channels.values():
+            if self.solo is None or ch.name == self.solo:
+                self._update_channel(ch, frame)
+            elif ch.active is not None:
+                self._exit(ch, frame)
+        return frame.status or ("Idle", "#888888")
+
+    def _match(self, ch, frame):
+        if frame.mask is None or frame.count < ch.hands:
+            return None
+        for g in ch.table[frame.mask]:
+            if frame.count < g.hands:
+                continue
+            if g.flag and not self.flags.get(g.flag, True):
+                continue
+            if g.when and not g.when(frame):
+                continue
+            return g
+        return None
+
+    def _update_channel(self, ch, frame):
+        now = frame.t
+        matched = self._match(ch, frame)
+
+        # Debounce: a new pose has to be stable before it takes over
+        if matched is not None and matched is not ch.active and matched.debounce > 0:
+            if ch.candidate is not matched:
+                ch.candidate, ch.candidate_since = matched, now
+            if now - ch.candidate_since < matched.debounce:
+                matched = None
+        else:
+            ch.candidate = None
+
+        active = ch.active
+        if matched is active:
+            ch.lost_since = None
+            if active:
+                self._run(active, frame)
+            return
+
+        # Short tracking dropouts do not end a held gesture
+        if matched is None and active is not None and active.linger > 0 and frame.mask is None:
+            if ch.lost_since is None:
+                ch.lost_since = now
+            if now - ch.lost_since < active.linger:
+                return
+
+        ch.lost_since = None
+        if active is not None:
+            self._exit(ch, frame)
+
+        if matched is not None:
+            ch.active = matched
+            ch.entered_at = now
+            if self.listener:
+                self.listener(matched.name, "enter", now)
+            if matched.on_enter:
+                matched.on_enter(self.host, frame)
+            self._run(matched, frame, entering=True)
+
+    def _exit(self, ch, frame):
+        active, ch.active = ch.active, None
+        if self.listener:
+            self.listener(active.name, "exit", frame.t)
+        if active.on_exit:
+            before = frame.status
+            active.on_exit(self.host, frame, frame.t - ch.entered_at)
+            if frame.status is not before:
+                # Kept apart: the next gesture's status would overwrite it
+                frame.event = frame.status
+
+    def _run(self, g, frame, entering=False):
+        now = frame.t
+        if g.on_fire and (entering or g.repeat is not None):
+            since = now - self.last_fire[g.name]
+            wait = g.cooldown if entering else max(g.cooldown, g.repeat)
+            if since >= wait:
+                self.last_fire[g.name] = now
+                if self.listener:
+                    self.listener(g.name, "fire", now)
+                g.on_fire(self.host, frame)
+        if g.status:
+            frame.status = g.status
+        if g.on_frame:
+            g.on_frame(self.host, frame)
+
+
+# --- DEFAULT GESTURES ---
+# Fingertip distances in frame pixels
+PINCH_DIST = 30
+RIGHT_CLICK_DIST = 40
+
+
+def _wrists_crossed(frame):
+    return frame.features.wrist_dist < 60
+
+
+def _toggle_sleep(host, frame):
+    host.toggle_sleep()
+
+
+def _volume_frame(host, frame):
+    dist = frame.features.index_dist
+    if frame.overlay is not None:
+        i1, i2 = frame.hands.points[:2, TIP_IDS[INDEX], :2].tolist()
+        frame.overlay.line(i1, i2, "#ff00ff")
+
+    if host.volume and not host.volume.failed:
+        # Quantized and rate limited in volume.VolumeController
+        frame.status = (f"VOL: {host.volume.update(dist)}%", "#00ffcc")
+
+
+def _toggle_ui(host, frame):
+    host.on_event(UiEvent.TOGGLE_UI)
+
+
+def _drag_enter(host, frame):
+    host.cursor.settle()
+    host.input.mouse_down()
+
+
+def _drag_frame(host, frame):
+    x, y = frame.lm[MIDDLE_MCP, :2].tolist()  # Knuckle
+    x3, y3 = host.mapper.map(x, y, frame.w, frame.h)
+    host.move_cursor(x3, y3, frame.t)
+
+
+def _drag_exit(host, frame, held):
+    host.cursor.settle()
+    host.input.mouse_up()
+    frame.status = ("Dropped", "#888888")
+
+
+def _back_fire(host, frame):
+    host.input.hotkey('alt', 'left')
+
+
+def _right_click_ready(frame):
+    return frame.tip_dist(INDEX, MIDDLE) < RIGHT_CLICK_DIST
+
+
+def _right_click_fire(host, frame):
+    host.cursor.settle()
+    host.input.right_click()
+
+
+def _pinching(frame):
+    return frame.tip_dist(INDEX, THUMB) < PINCH_DIST
+
+
+def _pinch_enter(host, frame):
+    # Freeze the cursor exactly where the click will land
+    host.cursor.settle()
+
+
+def _pinch_marker(frame, color):
+    if frame.overlay is not None:
+        (x1, y1), (x2, y2) = frame.lm[TIP_IDS[[THUMB, INDEX]], :2].tolist()
+        frame.overlay.point(((x1 + x2) / 2, (y1 + y2) / 2), 8, color)
+
+
+def _pinch_frame(host, frame):
+    _pinch_marker(frame, "#00ff00")
+
+
+def _pinch_exit(host, frame, held):
+    # Only a release (index still up, thumb moved away) clicks; losing the
+    # hand or changing pose mid-pinch cancels.
+    if not PINCH.accepts(frame.mask) or not host.gestures['left_click']:
+        return
+    if held < 0.2:
+        host.input.double_click()
+        frame.status = ("DBL CLICK", "#00ff00")
+    else:
+        host.input.click()
+        frame.status = ("CLICK", "#00ff00")
+
+
+def _move_frame(host, frame):
+    frame.status = (f"Moving ({host.active_hand_label})", "#00d4ff")
+    if frame.tip_dist(INDEX, THUMB) < PINCH_DIST * 1.5:
+        _pinch_marker(frame, "#ffff00")
+    x1, y1 = frame.lm[TIP_IDS[INDEX], :2].tolist()
+    x3, y3 = host.mapper.map(x1, y1, frame.w, frame.h)
+    host.move_cursor(x3, y3, frame.t)
+
+
+SLEEP = Gesture("sleep", channel="sleep", hands=2, when=_wrists_crossed, flag="sleep",
+                debounce=0.1, cooldown=1.0, on_fire=_toggle_sleep)
+VOLUME = Gesture("volume", channel="volume", hands=2, flag="volume", on_frame=_volume_frame)
+
+FOUR_FINGER = Gesture("four_finger", pattern="x1111", flag="four_finger", cooldown=0.5,
+                      status=("Toggle UI", "#888888"), on_fire=_toggle_ui)
+DRAG = Gesture("drag", pattern="00000", flag="drag", linger=0.15, status=("DRAGGING", "#ffaa00"),
+               on_enter=_drag_enter, on_frame=_drag_frame, on_exit=_drag_exit)
+BACK = Gesture("back", pattern="x1110", flag="back", cooldown=1.0, repeat=1.0,
+               status=("BACK", "#ff00ff"), on_fire=_back_fire)
+RIGHT_CLICK = Gesture("right_click", pattern="x110x", when=_right_click_ready, flag="right_click",
+                      cooldown=0.5, repeat=0.5, status=("RIGHT CLICK", "#ffff00"), on_fire=_right_click_fire)
+PINCH = Gesture("pinch", pattern="x10xx", when=_pinching, status=("Click Ready...", "#ffff00"),
+                on_enter=_pinch_enter, on_frame=_pinch_frame, on_exit=_pinch_exit)
+MOVE = Gesture("move", pattern="x10xx", flag="move", on_frame=_move_frame)
+
+DEFAULT_GESTURES = [SLEEP, VOLUME, FOUR_FINGER, DRAG, BACK, RIGHT_CLICK, PINCH, MOVE]
+
+
+def needs_precision(engine, features, near=1.5):
+    # True while a click decision is pending or close: pinch held (its
+    # release clicks) or fingertips within near x the click distances.
+    # Used to force fresh landmarks instead of propagated ones.
+    if engine.active() in ("pinch", "right_click"):
+        return True
+    n = features.count
+    if n == 0:
+        return False
+    d = features.tip_dist[:n]
+    return bool((d[:, INDEX, THUMB] < PINCH_DIST * near).any() or
+                (d[:, INDEX, MIDDLE] < RIGHT_CLICK_DIST * near).any())
+
+
+def build_engine(host, gestures=DEFAULT_GESTURES):
+    engine = GestureEngine(host, host.gestures)
+    for g in gestures:
+        engine.register(g)
+    return engine
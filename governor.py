@@ -0,0 +1,183 @@
+# governor.py
+import math
+from collections import deque
+import cv2
+import numpy as np
+
+
+class MotionDetector:
+    # Frame difference on a tiny grayscale thumbnail. Costs a fraction of a
+    # millisecond, so it can run on every frame while the hand model sleeps.
+
+    def __init__(self, size=(64, 48), threshold=12, min_fraction=0.01):
+        self.size = size
+        self.set_sensitivity(threshold, min_fraction)
+        self._small = np.empty((size[1], size[0], 3), np.uint8)
+        self._gray = np.empty((size[1], size[0]), np.uint8)
+        self._diff = np.empty((size[1], size[0]), np.uint8)
+        self.prev = None
+
+    def set_sensitivity(self, threshold, min_fraction):
+        self.threshold = threshold
+        self.min_pixels = max(1, int(min_fraction * self.size[0] * self.size[1]))
+
+    def reset(self):
+        self.prev = None
+
+    def check(self, frame):
+        # True when frame differs enough from the previous checked frame
+        cv2.resize(frame, self.size, dst=self._small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY, dst=self._gray)
+        if self.prev is None:
+            self.prev = self._gray.copy()
+            return False
+        cv2.absdiff(self._gray, self.prev, dst=self._diff)
+        self.prev[:] = self._gray
+        return np.count_nonzero(self._diff > self.threshold) >= self.min_pixels
+
+
+class IdleGovernor:
+    # Low-power mode for when nobody is in front of the camera. After
+    # idle_after seconds without a hand, hand inference is gated behind the
+    # motion detector. The first frame with motion wakes everything up and
+    # is itself processed at full quality, so the wake costs 1-2 frames; if
+    # no hand shows up within wake_grace seconds the governor goes back to
+    # idle. idle_fps > 0 additionally slows decoding while idle, which adds
+    # up to 1 / idle_fps to the wake latency.
+
+    def __init__(self, enabled=True, idle_after=10.0, idle_fps=0, wake_grace=2.0, motion=None):
+        self.enabled = enabled
+        self.idle_after = idle_after
+        self.idle_fps = idle_fps
+        self.wake_grace = wake_grace
+        self.motion = motion or MotionDetector()
+
+        self.idle = False
+        self.deadline = None
+
+        # Counters
+        self.idle_entries = 0
+        self.wakeups = 0
+        self.gated = 0
+
+    @classmethod
+    def from_settings(cls, settings):
+        governor = cls()
+        governor.configure(settings)
+        return governor
+
+    def configure(self, settings):
+        # Also applied live. Disabling wakes the pipeline up for good.
+        self.enabled = settings["idle_enabled"]
+        self.idle_after = settings["idle_after_s"]
+        self.idle_fps = settings["idle_fps"]
+        self.wake_grace = settings["idle_wake_grace_s"]
+        self.motion.set_sensitivity(settings["motion_threshold"], settings["motion_min_fraction"])
+        if not self.enabled:
+            self.idle = False
+            self.deadline = None
+
+    def gate(self, frame, t):
+        # Whether this raw camera frame should go through inference
+        if not self.idle:
+            return True
+        if self.motion.check(frame):
+            self.idle = False
+            self.deadline = t + self.wake_grace
+            self.wakeups += 1
+            return True
+        self.gated += 1
+        return False
+
+    def update(self, t, hand_count):
+        # After every processed frame
+        if not self.enabled:
+            return
+        if hand_count:
+            self.deadline = t + self.idle_after
+        elif self.deadline is None:
+            self.deadline = t + self.idle_after
+        elif not self.idle and t >= self.deadline:
+            self.idle = True
+            self.motion.reset()
+            self.idle_entries += 1
+
+    def capture_fps(self):
+        # Decode rate for the frame grabber, 0 for the camera's own rate
+        return self.idle_fps if self.idle else 0
+
+
+class QualityGovernor:
+    # Keeps hand inference inside a per-frame latency budget by walking a
+    # quality ladder, best first:
+    #   (model_complexity, input scale)
+    # Input scale shrinks the full-frame input and the ROI crop limit; only
+    # a complexity or hand-count change needs a new MediaPipe model.
+    #
+    # The median of the last `window` inference times decides: above the
+    # target by 15% steps down, below 60% of it steps up. After a step the
+    # samples are discarded and nothing moves for settle_s. A level that was
+    # just left for being too slow is off limits for backoff_s.
+
+    LEVELS = ((1, 1.0), (1, 0.75), (0, 1.0), (0, 0.75), (0, 0.5))
+
+    def __init__(self, enabled=True, target_ms=25.0, window=30, settle_s=2.0, backoff_s=30.0, level=0):
+        self.enabled = enabled
+        self.target = target_ms / 1000
+        self.settle_s = settle_s
+        self.backoff_s = backoff_s
+        self.level = level
+        self.max_hands = 2
+        self.samples = deque(maxlen=window)
+        self.changed_at = -math.inf
+        self.too_slow_until = [-math.inf] * len(self.LEVELS)
+
+        # Counters
+        self.steps_down = 0
+        self.steps_up = 0
+
+    @classmethod
+    def from_settings(cls, settings):
+        governor = cls(level=settings["quality_level"])
+        governor.configure(settings)
+        return governor
+
+    def configure(self, settings):
+        # Also applied live. quality_level is only the starting level, so
+        # a reload never moves the ladder (or rebuilds the model) by itself.
+        self.enabled = settings["quality_enabled"]
+        self.target = settings["latency_target_ms"] / 1000
+
+    @property
+    def complexity(self):
+        return self.LEVELS[self.level][0]
+
+    @property
+    def scale(self):
+        return self.LEVELS[self.level][1]
+
+    def config(self):
+        # Whatever requires rebuilding the model when it changes
+        return self.max_hands, self.complexity
+
+    def record(self, t, seconds):
+        # One inference duration, measured at capture time t
+        if not self.enabled:
+            return
+        self.samples.append(seconds)
+        if t - self.changed_at < self.settle_s or len(self.samples) < self.samples.maxlen:
+            return
+
+        p50 = float(np.median(self.samples))
+        if p50 > self.target * 1.15 and self.level < len(self.LEVELS) - 1:
+            self.too_slow_until[self.level] = t + self.backoff_s
+            self.level += 1
+            self.steps_down += 1
+        elif (p50 < self.target * 0.6 and self.level > 0 and
+              t >= self.too_slow_until[self.level - 1]):
+            self.level -= 1
+            self.steps_up += 1
+        else:
+            return
+        self.changed_at = t
+        self.samples.clear()
@@ -0,0 +1,201 @@
+# headless.py
+import argparse
+import json
+import signal
+import sys
+import threading
+import time
+from capture import FrameGrabber, make_source
+from input_dispatch import InputDispatcher, make_backend, BACKENDS
+from pipeline import GesturePipeline
+from metrics import PipelineMetrics, now
+from settings import SettingsStore, SETTINGS_PATH
+from status import StatusModel
+from volume import VolumeController
+from bus import EventBus
+
+
+class HeadlessRunner:
+    # The tracking and gesture pipeline without Qt: no window, no preview
+    # conversion, no event loop. Same camera thread, pipeline, input
+    # dispatcher, volume controller and live settings as the dashboard;
+    # statuses and periodic stats go to a text stream. stop() (or a
+    # signal, see main) ends the loop within one frame read.
+
+    def __init__(self, store, input_backend=None, out=sys.stdout, stats_s=10.0, metrics_path=None):
+        self.store = store
+        self.settings = store.current
+        self.out = out
+        self.stats_s = stats_s
+        self.metrics_path = metrics_path
+        self.metrics = PipelineMetrics()
+        self.status = StatusModel(self._log_status, self.settings["status_interval"])
+        self._stop = threading.Event()
+
+        self.volume = VolumeController.from_settings(self.settings)
+        backend = make_backend(input_backend or self.settings["input_backend"])
+        self.input = InputDispatcher(backend, metrics=self.metrics)
+        self.bus = EventBus.from_settings(self.settings) if self.settings["bus_enabled"] else None
+        # A backend without a screen (record) brings its own geometry, so
+        # the screen mapping does not need pyautogui or a display
+        self.pipeline = GesturePipeline(self.settings, self.input, self._log_event, self.metrics,
+                                        volume=self.volume, monitors=getattr(backend, "monitors", None),
+                                        bus=self.bus)
+        self.grabber = None
+
+        # Counters
+        self.frames = 0
+
+    def log(self, text):
+        self.out.write(f"{time.strftime('%H:%M:%S')} {text}\n")
+        self.out.flush()
+
+    def _log_status(self, text, color):
+        self.log(f"status: {text}")
+
+    def _log_event(self, event):
+        # Window actions (toggle UI) have no window to act on; sleep still
+        # works since the pipeline handles it itself
+        self.log(f"event: {event.value}")
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self, duration=None):
+        # Whatever fails on the way up (no camera, no model) still stops
+        # the threads already started
+        self.store.start()
+        t_start = now()
+        try:
+            self.volume.start()
+            self.input.start()
+            if self.bus:
+                self.bus.start()
+                self.log(f"event bus unavailable at {self.bus.address}" if self.bus.failed
+                         else f"event bus at {self.bus.address}")
+            self.pipeline.start()
+            self.grabber = FrameGrabber(make_source(self.settings), self.metrics)
+            self.grabber.start()
+            self.pipeline.load_model()
+            self.log("running")
+
+            t_start = last_stats = now()
+            frames_at_stats = 0
+            while not self._stop.is_set():
+                if duration is not None and now() - t_start >= duration:
+                    break
+                # Wake up in time for a status held back by the rate limit
+                due = self.status.due()
+                packet = self.grabber.read(timeout=0.5 if due is None else min(0.5, due))
+                self.status.flush()
+                if packet is None:
+                    continue
+                frame, t_capture, _ = packet
+                settings = self.store.current
+                if settings is not self.settings:
+                    self.settings = settings
+                    self.pipeline.apply_settings(settings)
+                    self.status.min_interval = settings["status_interval"]
+                    self.log("settings reloaded")
+
+                t0 = now()
+                _, _, status = self.pipeline.process_frame(frame, t_capture)
+                if self.pipeline.status_event:
+                    self.status.update(*self.pipeline.status_event, event=True)
+                self.status.update(*status)
+                self.grabber.max_fps = self.pipeline.governor.capture_fps()
+                self.metrics.record("queue", t0 - t_capture)
+                self.metrics.count("frames")
+                self.frames += 1
+
+                if self.stats_s and t0 - last_stats >= self.stats_s:
+                    self.report(self.frames - frames_at_stats, t0 - last_stats)
+                    last_stats, frames_at_stats = t0, self.frames
+        finally:
+            self.shutdown(now() - t_start)
+
+    def report(self, frames, seconds):
+        m = self.metrics
+        m.set("dropped", self.grabber.frames_dropped if self.grabber else 0)
+        m.set("keyframes", self.pipeline.flow.keyframes)
+        m.set("flow_frames", self.pipeline.flow.propagated)
+        m.set("idle_gated", self.pipeline.governor.gated)
+        m.set("quality_level", self.pipeline.quality.level)
+        m.set("volume_writes", self.volume.writes)
+        if self.bus:
+            m.set("bus_subscribers", len(self.bus.subscribers))
+            m.set("bus_dropped", self.bus.dropped)
+        snap = m.snapshot()
+        parts = [f"fps {frames / max(seconds, 1e-9):.1f}"]
+        for name in ("inference", "flow", "gestures", "end_to_end"):
+            s = snap["stages"][name]
+            if s["count"]:
+                parts.append(f"{name} p50 {s['p50']:.1f} p95 {s['p95']:.1f} ms")
+        parts.append(f"dropped {snap['counters']['dropped']}")
+        self.log("stats: " + " | ".join(parts))
+        if self.metrics_path:
+            m.export_json(self.metrics_path)
+
+    def shutdown(self, elapsed):
+        if self.grabber:
+            self.grabber.stop()
+        self.pipeline.stop()
+        self.input.stop()
+        self.volume.stop()
+        if self.bus:
+            self.bus.stop()
+        self.store.stop()
+        self.report(self.frames, elapsed)     # whole-run averages
+        self.log(f"stopped after {self.frames} frames")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="AVM without the dashboard (kiosk / daemon mode)")
+    parser.add_argument("--settings", default=SETTINGS_PATH, help="settings file, watched for changes")
+    parser.add_argument("--source", choices=("camera", "file", "synthetic"), help="overrides capture_source")
+    parser.add_argument("--path", help="video file for --source file")
+    parser.add_argument("--camera", type=int, help="overrides capture_index")
+    parser.add_argument("--input", choices=sorted(BACKENDS), help="overrides input_backend")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=JSON",
+                        help="override a setting, e.g. --set idle_fps=2 (repeatable)")
+    parser.add_argument("--stats", type=float, default=10.0, help="seconds between stats lines (0 = off)")
+    parser.add_argument("--log", help="append to this file instead of stdout")
+    parser.add_argument("--metrics-json", help="rewrite this metrics snapshot with every stats line")
+    parser.add_argument("--duration", type=float, help="stop after this many seconds")
+    args = parser.parse_args(argv)
+
+    overrides = {}
+    for item in args.set:
+        key, _, value = item.partition("=")
+        try:
+            overrides[key] = json.loads(value)
+        except ValueError:
+            overrides[key] = value
+    if args.source:
+        overrides["capture_source"] = args.source
+    if args.path:
+        overrides["capture_path"] = args.path
+    if args.camera is not None:
+        overrides["capture_index"] = args.camera
+
+    out = open(args.log, "a") if args.log else sys.stdout
+    store = SettingsStore(args.settings, overrides=overrides)
+    for problem in store.problems:
+        out.write(f"settings: {problem}\n")
+    runner = HeadlessRunner(store, args.input, out, args.stats, args.metrics_json)
+
+    # SIGINT / SIGTERM end the loop: the handler only sets a flag and the
+    # loop shuts everything down. The settings file is watched anyway, so
+    # there is no reload signal.
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: runner.stop())
+    try:
+        runner.run(args.duration)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
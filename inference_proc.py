@@ -0,0 +1,300 @@
+# inference_proc.py
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+from features import HandLandmarks
+from recording import LABELS
+from roi import crop_input
+from metrics import now
+
+# Inference-process mode. The vision thread converts each camera frame
+# straight into a shared-memory ring slot (cvtColor with dst=, no extra
+# copy) and hands the child the slot index plus the ROI. The child crops,
+# runs MediaPipe and writes full-frame landmarks back. Both directions use
+# a single-producer single-consumer ring in shared memory; the semaphores
+# are only doorbells so neither side has to spin.
+#
+# One child process only: MediaPipe's tracker is stateful, so spreading
+# consecutive frames over a pool would break its frame-to-frame tracking.
+# Pipelined use keeps it busy anyway: the request for frame N is answered
+# while the parent captures and converts frame N+1 (submit / collect).
+
+REQUEST = np.dtype([("seq", "<u8"), ("slot", "<u4"), ("roi", "<i4", 4), ("max_hands", "u1"),
+                    ("complexity", "u1"), ("scale", "<f4")])
+RESULT = np.dtype([("seq", "<u8"), ("t_done", "<f8"), ("count", "<u4"), ("labels", "u1", 2),
+                   ("points", "<f4", (2, 21, 3))])
+STOP = np.iinfo(np.uint64).max
+
+_HEAD, _TAIL = 0, 8     # uint64 indexes, a cache line apart
+
+
+def _release(shm, unlink=False):
+    # Arrays still viewing the block (e.g. a preview frame) keep the
+    # mapping alive; the OS frees it once the last view is gone
+    try:
+        shm.close()
+    except BufferError:
+        pass
+    if unlink:
+        shm.unlink()
+
+
+class SpscRing:
+    # Lock-free ring of fixed-size records over a shared-memory block.
+    # Exactly one process pushes (and only writes head), exactly one pops
+    # (and only writes tail). A record is written before head is bumped, so
+    # the consumer never sees a half-written record.
+
+    def __init__(self, dtype, capacity, name=None):
+        self.capacity = capacity
+        size = 16 * 8 + dtype.itemsize * capacity
+        self.shm = shared_memory.SharedMemory(name=name, create=name is None, size=size)
+        self.name = self.shm.name
+        self.index = np.ndarray(16, np.uint64, self.shm.buf)
+        self.records = np.ndarray(capacity, dtype, self.shm.buf, offset=16 * 8)
+        if name is None:
+            self.index[:] = 0
+
+    def push(self, **fields):
+        head = int(self.index[_HEAD])
+        if head - int(self.index[_TAIL]) >= self.capacity:
+            return False
+        rec = self.records[head % self.capacity]
+        for key, value in fields.items():
+            rec[key] = value
+        self.index[_HEAD] = head + 1
+        return True
+
+    def pop(self):
+        tail = int(self.index[_TAIL])
+        if tail == int(self.index[_HEAD]):
+            return None
+        rec = self.records[tail % self.capacity].copy()
+        self.index[_TAIL] = tail + 1
+        return rec
+
+    def close(self, unlink=False):
+        self.index = self.records = None
+        _release(self.shm, unlink)
+
+
+def _inference_main(frames_name, shape, slots, req_name, res_name, req_bell, res_bell,
+                    max_input, min_detection_confidence):
+    # Child process: MediaPipe is only imported here. The model is (re)built
+    # whenever a request asks for a different hand count or complexity.
+    import mediapipe
+
+    frames_shm = shared_memory.SharedMemory(name=frames_name)
+    frames = np.ndarray((slots,) + shape, np.uint8, frames_shm.buf)
+    requests = SpscRing(REQUEST, slots, req_name)
+    results = SpscRing(RESULT, slots, res_name)
+    model, config = None, None
+    hands = HandLandmarks(2)
+    h, w = shape[:2]
+    labels = np.zeros(2, np.uint8)
+    rgb = None
+
+    try:
+        while True:
+            if not req_bell.acquire(timeout=1.0):
+                continue
+            req = requests.pop()
+            if req is None:
+                continue
+            if req["seq"] == STOP:
+                break
+            if config != (req["max_hands"], req["complexity"]):
+                if model:
+                    model.close()
+                config = (req["max_hands"], req["complexity"])
+                model = mediapipe.solutions.hands.Hands(
+                    max_num_hands=int(config[0]), model_complexity=int(config[1]),
+                    min_detection_confidence=min_detection_confidence)
+            roi = tuple(req["roi"].tolist()) if req["roi"][0] >= 0 else None
+            rgb = frames[req["slot"]]
+            model_input = crop_input(rgb, roi, max_input, float(req["scale"]))
+            hands.load_mediapipe(model.process(model_input), w, h, roi)
+            for i in range(hands.count):
+                labels[i] = LABELS.index(hands.labels[i])
+            # perf_counter is the same clock in both processes
+            results.push(seq=req["seq"], t_done=now(), count=hands.count, labels=labels, points=hands.points)
+            res_bell.release()
+    finally:
+        if model:
+            model.close()
+        frames = rgb = None
+        requests.close()
+        results.close()
+        _release(frames_shm)
+
+
+class InferenceProcess:
+    # Parent side. frame_buffer() gives the slot the next camera frame
+    # should be converted into. submit() sends that slot to the child and
+    # returns at once; collect() waits for the answer (without holding the
+    # GIL), normally one frame later. infer() is both back to back.
+    #
+    # A child that dies is respawned on the next frame_buffer(), at most
+    # max_restarts times in a row; after that `failed` is set and the
+    # caller should run MediaPipe in-process instead.
+
+    def __init__(self, max_input=320, slots=4, min_detection_confidence=0.7,
+                 first_timeout=15.0, timeout=1.0, pipelined=True, max_restarts=3):
+        self.max_input = max_input
+        self.slots = max(slots, 3)      # pipelined: slot N-1 is read while N is written
+        self.min_detection_confidence = min_detection_confidence
+        self.first_timeout = first_timeout
+        self.timeout = timeout
+        self.pipelined = pipelined
+        self.max_restarts = max_restarts
+
+        self.shape = None
+        self.proc = None
+        self.frames = None
+        self.seq = 0
+        self.slot = -1
+        self.frame_no = 0       # frame_buffer() calls, to tell when a slot was reused
+        self.pending = None     # (seq, slot, frame_no, t, t_submit) of the request in flight
+        self.round_trip = 0.0   # submit to result ready, for the last collected answer
+        self.answered = False
+        self.config = None
+        self.failed = False
+
+        # Counters
+        self.timeouts = 0
+        self.stale_results = 0
+        self.restarts = 0
+
+    def _start(self, shape):
+        self.close()
+        ctx = mp.get_context("spawn")
+        self.shape = shape
+        size = int(np.prod(shape)) * self.slots
+        self.frames_shm = shared_memory.SharedMemory(create=True, size=size)
+        self.frames = np.ndarray((self.slots,) + shape, np.uint8, self.frames_shm.buf)
+        self.requests = SpscRing(REQUEST, self.slots)
+        self.results = SpscRing(RESULT, self.slots)
+        self.req_bell = ctx.Semaphore(0)
+        self.res_bell = ctx.Semaphore(0)
+        self.proc = ctx.Process(target=_inference_main, daemon=True, name="AVM-Inference", args=(
+            self.frames_shm.name, shape, self.slots, self.requests.name, self.results.name,
+            self.req_bell, self.res_bell, self.max_input, self.min_detection_confidence))
+        self.proc.start()
+        self.answered = False
+        self.config = None
+        self.pending = None
+
+    def alive(self):
+        return self.proc is not None and self.proc.is_alive()
+
+    def frame_buffer(self, h, w):
+        # Next ring slot as an (h, w, 3) uint8 array, or None once failed.
+        # Slots are reused round-robin, so a slot stays valid for slots - 1
+        # more frames.
+        shape = (h, w, 3)
+        if not self.failed and (shape != self.shape or not self.alive()):
+            if shape == self.shape:
+                self.restarts += 1      # same frame size: the child died
+            if self.restarts > self.max_restarts:
+                self.failed = True
+            else:
+                try:
+                    self._start(shape)
+                except Exception:
+                    self.failed = True
+        if self.failed or self.frames is None:
+            return None
+        self.frame_no += 1
+        self.slot = (self.slot + 1) % self.slots
+        return self.frames[self.slot]
+
+    def submit(self, t, roi=None, max_hands=2, complexity=1, scale=1.0):
+        # Sends the slot last returned by frame_buffer(); one request is in
+        # flight at a time, so an unanswered one is collected (and dropped)
+        # first. A new max_hands / complexity makes the child rebuild its
+        # model, and that first answer may take up to first_timeout.
+        if self.failed or self.frames is None:
+            return False
+        if self.pending is not None:
+            self._wait(self.pending[0])
+            self.pending = None
+        self.seq += 1
+        roi_field = roi if roi is not None else (-1, -1, -1, -1)
+        if (max_hands, complexity) != self.config:
+            self.config = (max_hands, complexity)
+            self.answered = False
+        if not self.requests.push(seq=self.seq, slot=self.slot, roi=roi_field, max_hands=max_hands,
+                                  complexity=complexity, scale=scale):
+            self.timeouts += 1
+            return False
+        self.req_bell.release()
+        self.pending = (self.seq, self.slot, self.frame_no, t, now())
+        return True
+
+    def collect(self, hands):
+        # Answer to the request in flight, loaded into hands. Returns
+        # (frame, t): the slot and capture time the landmarks belong to, or
+        # None (nothing in flight, timeout, or the slot was reused since).
+        if self.pending is None:
+            return None
+        seq, slot, frame_no, t, t_submit = self.pending
+        self.pending = None
+        res = self._wait(seq)
+        if res is None:
+            return None
+        # Time the child took, not the (usually much shorter) wait here
+        self.round_trip = float(res["t_done"]) - t_submit
+        if self.frame_no - frame_no >= self.slots - 1:
+            self.stale_results += 1
+            return None
+        n = int(res["count"])
+        hands.load(res["points"][:n], [LABELS[i] for i in res["labels"][:n].tolist()])
+        return self.frames[slot], t
+
+    def infer(self, hands, roi=None, max_hands=2, complexity=1, scale=1.0, t=0.0):
+        # Synchronous: landmarks for the slot last returned by
+        # frame_buffer(). A timeout leaves no hands for this frame.
+        hands.count = 0
+        if self.submit(t, roi, max_hands, complexity, scale):
+            self.collect(hands)
+        return hands
+
+    def _wait(self, seq):
+        # Result record for seq, or None after the timeout. A dead child
+        # ends the wait at once instead of after the full timeout.
+        deadline = now() + (self.timeout if self.answered else self.first_timeout)
+        while True:
+            remaining = deadline - now()
+            if remaining <= 0:
+                break
+            if self.res_bell.acquire(timeout=min(remaining, 0.1)):
+                res = self.results.pop()
+                if res is None:
+                    continue
+                if res["seq"] != seq:
+                    # Answer to a request that already timed out
+                    self.stale_results += 1
+                    continue
+                self.answered = True
+                self.restarts = 0
+                return res
+            if not self.alive():
+                break
+        self.timeouts += 1
+        return None
+
+    def close(self):
+        if self.proc is None:
+            return
+        if self.proc.is_alive():
+            self.requests.push(seq=STOP)
+            self.req_bell.release()
+            self.proc.join(timeout=2.0)
+            if self.proc.is_alive():
+                self.proc.terminate()
+        self.proc = None
+        self.frames = None
+        self.requests.close(unlink=True)
+        self.results.close(unlink=True)
+        _release(self.frames_shm, unlink=True)
+        self.shape = None
@@ -0,0 +1,342 @@
+# input_dispatch.py
+import sys
+import threading
+import time
+from collections import deque
+from metrics import now
+
+
+# --- BACKENDS ---
+# Every backend exposes the same small set of calls. They are only ever
+# invoked from the dispatcher thread, never from the vision loop.
+
+class PyAutoGuiBackend:
+    name = "pyautogui"
+
+    def __init__(self):
+        import pyautogui
+        self.gui = pyautogui
+        # The built-in sleep after every call is what stalled the loop
+        self.gui.PAUSE = 0
+
+    def move(self, x, y):
+        self.gui.moveTo(x, y)
+
+    def mouse_down(self):
+        self.gui.mouseDown()
+
+    def mouse_up(self):
+        self.gui.mouseUp()
+
+    def click(self):
+        self.gui.click()
+
+    def double_click(self):
+        self.gui.doubleClick()
+
+    def right_click(self):
+        self.gui.rightClick()
+
+    def hotkey(self, *keys):
+        self.gui.hotkey(*keys)
+
+    def press(self, key):
+        self.gui.press(key)
+
+    def write(self, text):
+        self.gui.write(text)
+
+
+class RawBackend:
+    # Talks to the OS directly (user32 on Windows, XTest on X11), skipping
+    # pyautogui's argument checks, failsafe polling and tweening.
+    name = "raw"
+
+    WIN_VK = {
+        "win": 0x5B, "alt": 0x12, "ctrl": 0x11, "shift": 0x10, "enter": 0x0D,
+        "tab": 0x09, "esc": 0x1B, "space": 0x20, "left": 0x25, "up": 0x26,
+        "right": 0x27, "down": 0x28, "f4": 0x73, "backspace": 0x08,
+    }
+    X11_KEYSYM = {
+        "win": "Super_L", "alt": "Alt_L", "ctrl": "Control_L", "shift": "Shift_L",
+        "enter": "Return", "tab": "Tab", "esc": "Escape", "space": "space",
+        "left": "Left", "up": "Up", "right": "Right", "down": "Down",
+        "f4": "F4", "backspace": "BackSpace",
+    }
+
+    def __init__(self):
+        import ctypes
+        self.ct = ctypes
+        if sys.platform == "win32":
+            self.user32 = ctypes.windll.user32
+            self.x11 = None
+        else:
+            import ctypes.util
+            self.user32 = None
+            self.x11 = self._load("X11")
+            self.xtst = self._load("Xtst")
+            self.x11.XOpenDisplay.restype = ctypes.c_void_p
+            self.x11.XStringToKeysym.restype = ctypes.c_ulong
+            self.display = self.x11.XOpenDisplay(None)
+            if not self.display:
+                raise RuntimeError("No X display for raw input backend")
+
+    def _load(self, name):
+        # LoadLibrary(None) would hand back the interpreter itself and only
+        # fail on the first call
+        path = self.ct.util.find_library(name)
+        if path is None:
+            raise OSError(f"lib{name} not found for raw input backend")
+        return self.ct.cdll.LoadLibrary(path)
+
+    # Mouse
+    def move(self, x, y):
+        if self.user32:
+            self.user32.SetCursorPos(int(x), int(y))
+        else:
+            self.xtst.XTestFakeMotionEvent(self.ct.c_void_p(self.display), -1, int(x), int(y), 0)
+            self.x11.XFlush(self.ct.c_void_p(self.display))
+
+    def _button(self, button, down):
+        if self.user32:
+            # MOUSEEVENTF_LEFTDOWN/UP = 0x2/0x4, RIGHTDOWN/UP = 0x8/0x10
+            flag = {1: (0x2, 0x4), 3: (0x8, 0x10)}[button][0 if down else 1]
+            self.user32.mouse_event(flag, 0, 0, 0, 0)
+        else:
+            self.xtst.XTestFakeButtonEvent(self.ct.c_void_p(self.display), button, int(down), 0)
+            self.x11.XFlush(self.ct.c_void_p(self.display))
+
+    def mouse_down(self):
+        self._button(1, True)
+
+    def mouse_up(self):
+        self._button(1, False)
+
+    def click(self):
+        self._button(1, True)
+        self._button(1, False)
+
+    def double_click(self):
+        self.click()
+        self.click()
+
+    def right_click(self):
+        self._button(3, True)
+        self._button(3, False)
+
+    # Keyboard
+    def _key(self, key, down):
+        # Named keys ("alt", "Enter") go through the tables in any case;
+        # anything else (a character, or a native keysym like "Alt_L") is
+        # used exactly as given
+        name = key.lower()
+        if self.user32:
+            vk = self.WIN_VK.get(name)
+            if vk is None:
+                vk = self.user32.VkKeyScanW(ord(key)) & 0xFF
+            # KEYEVENTF_KEYUP = 0x2
+            self.user32.keybd_event(vk, 0, 0 if down else 0x2, 0)
+        else:
+            sym = self.x11.XStringToKeysym(self.X11_KEYSYM.get(name, key).encode())
+            code = self.x11.XKeysymToKeycode(self.ct.c_void_p(self.display), self.ct.c_ulong(sym))
+            self.xtst.XTestFakeKeyEvent(self.ct.c_void_p(self.display), code, int(down), 0)
+            self.x11.XFlush(self.ct.c_void_p(self.display))
+
+    def hotkey(self, *keys):
+        for k in keys:
+            self._key(k, True)
+        for k in reversed(keys):
+            self._key(k, False)
+
+    def press(self, key):
+        self._key(key, True)
+        self._key(key, False)
+
+    def _shifted(self, ch):
+        if self.user32:
+            # High byte of VkKeyScanW: bit 0 = shift
+            return bool((self.user32.VkKeyScanW(ord(ch)) >> 8) & 1)
+        return ch.isupper()
+
+    def write(self, text):
+        for ch in text:
+            if self._shifted(ch):
+                self.hotkey("shift", ch)
+            else:
+                self.press(ch)
+
+
+class RecordingBackend:
+    # Stands in for the OS in tests and replays: just remembers the calls.
+    # monitors is the screen geometry it pretends to have (see
+    # cursor.list_monitors), so nothing asks the real display.
+    name = "record"
+
+    def __init__(self, monitors=((0, 0, 1920, 1080),)):
+        self.monitors = list(monitors)
+        self.events = []
+        self.x, self.y = 0, 0
+
+    def _log(self, name, *args):
+        self.events.append((now(), name, args))
+
+    def move(self, x, y):
+        self.x, self.y = x, y
+        self._log("move", x, y)
+
+    def mouse_down(self):
+        self._log("mouse_down")
+
+    def mouse_up(self):
+        self._log("mouse_up")
+
+    def click(self):
+        self._log("click")
+
+    def double_click(self):
+        self._log("double_click")
+
+    def right_click(self):
+        self._log("right_click")
+
+    def hotkey(self, *keys):
+        self._log("hotkey", *keys)
+
+    def press(self, key):
+        self._log("press", key)
+
+    def write(self, text):
+        self._log("write", text)
+
+
+BACKENDS = {
+    "pyautogui": PyAutoGuiBackend,
+    "raw": RawBackend,
+    "record": RecordingBackend,
+}
+
+
+def make_backend(name="pyautogui"):
+    # The raw backend falls back to pyautogui when its OS libraries or
+    # display are missing
+    try:
+        return BACKENDS[name]()
+    except (OSError, RuntimeError):
+        if name != "raw":
+            raise
+        return BACKENDS["pyautogui"]()
+
+
+# --- DISPATCHER ---
+
+class InputDispatcher(threading.Thread):
+    # The gesture loop posts events here and returns immediately. Back-to-back
+    # cursor moves are merged so only the newest target reaches the OS;
+    # clicks, drags and keys keep their order.
+
+    def __init__(self, backend=None, metrics=None):
+        super().__init__(daemon=True)
+        self.backend = backend if backend is not None else make_backend()
+        self.metrics = metrics
+        self.running = False
+
+        self._cond = threading.Condition()
+        self._queue = deque()
+
+        # Counters
+        self.events_applied = 0
+        self.moves_coalesced = 0
+        self.errors = 0
+
+    def start(self):
+        self.running = True
+        super().start()
+
+    def post(self, name, *args, origin=None):
+        # origin: capture time of the frame that caused the event, used for
+        # the motion-to-cursor latency
+        with self._cond:
+            if name == "move" and self._queue and self._queue[-1][0] == "move":
+                self._queue[-1] = (name, args, origin)
+                self.moves_coalesced += 1
+            else:
+                self._queue.append((name, args, origin))
+            self._cond.notify()
+
+    # Convenience wrappers
+    def move(self, x, y, origin=None):
+        self.post("move", x, y, origin=origin)
+
+    def mouse_down(self):
+        self.post("mouse_down")
+
+    def mouse_up(self):
+        self.post("mouse_up")
+
+    def click(self):
+        self.post("click")
+
+    def double_click(self):
+        self.post("double_click")
+
+    def right_click(self):
+        self.post("right_click")
+
+    def hotkey(self, *keys):
+        self.post("hotkey", *keys)
+
+    def press(self, key):
+        self.post("press", key)
+
+    def write(self, text):
+        self.post("write", text)
+
+    def wait(self, seconds):
+        # Pause between events (e.g. letting a Run dialog open) without
+        # blocking whoever posted them.
+        self.post("wait", seconds)
+
+    def pending(self):
+        with self._cond:
+            return len(self._queue)
+
+    def _apply(self, name, args, origin):
+        try:
+            if name == "wait":
+                time.sleep(args[0])
+                return
+            t_start = now()
+            getattr(self.backend, name)(*args)
+            self.events_applied += 1
+            if self.metrics:
+                t_done = now()
+                self.metrics.record("inject", t_done - t_start)
+                if origin is not None:
+                    self.metrics.record("end_to_end", t_done - origin)
+        except Exception:
+            self.errors += 1
+
+    def run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue or not self.running)
+                if not self._queue:
+                    break
+                event = self._queue.popleft()
+            self._apply(*event)
+
+    def drain(self):
+        # Applies everything queued on the calling thread. Only for a
+        # dispatcher that was never started (replays, benchmarks).
+        while True:
+            with self._cond:
+                if not self._queue:
+                    return
+                event = self._queue.popleft()
+            self._apply(*event)
+
+    def stop(self):
+        # Drains what is already queued, then exits
+        with self._cond:
+            self.running = False
+            self._cond.notify()
@@ -1,16 +1,57 @@
+import time
+T0 = time.perf_counter()    # before any heavy import, for the startup breakdown
+
 import sys
+from PySide6.QtCore import QThread, QTimer, Slot
 from PySide6.QtWidgets import QApplication
-from ui import MainWindow
-from worker import VideoWorker
+from startup import StartupTimer
+
+
+class Launcher(QThread):
+    # Imports the vision stack (numpy, OpenCV, pipeline, input backend,
+    # MediaPipe) on a background thread while the window paints, then
+    # builds and starts the VideoWorker back on the GUI thread.
+
+    def __init__(self, window, startup):
+        super().__init__()
+        self.window = window
+        self.startup = startup
+        self.worker = None
+        self.finished.connect(self.start_worker)
+        QApplication.instance().aboutToQuit.connect(self.shutdown)
+
+    def run(self):
+        with self.startup.phase("imports"):
+            import worker
+            from settings import load_settings
+            worker.preload(load_settings())
+
+    @Slot()
+    def start_worker(self):
+        from worker import VideoWorker
+        with self.startup.phase("worker_init"):
+            self.worker = VideoWorker(self.startup)
+        self.window.set_worker(self.worker)
+        self.worker.start()
+
+    @Slot()
+    def shutdown(self):
+        if self.worker:
+            self.worker.stop()
+
 
 def main():
-    app = QApplication(sys.argv)
-    worker = VideoWorker()
-    window = MainWindow()
-    window.set_worker(worker)
-    window.show()
-    worker.start()
+    startup = StartupTimer(T0)
+    with startup.phase("qt"):
+        app = QApplication(sys.argv)
+    with startup.phase("window"):
+        from ui import MainWindow
+        window = MainWindow()
+        window.show()
+    QTimer.singleShot(0, lambda: startup.mark("window_painted"))
+    launcher = Launcher(window, startup)
+    launcher.start()
     sys.exit(app.exec())
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,111 @@
+# metrics.py
+import csv
+import json
+import time
+
+# One clock for every timestamp in the pipeline (capture stamps, stage
+# timings, cursor timing). perf_counter is monotonic and, unlike
+# time.monotonic on older Windows Pythons, has sub-millisecond resolution.
+now = time.perf_counter
+
+STAGES = (
+    "capture",      # camera read (grabber thread)
+    "queue",        # capture -> picked up by the vision loop
+    "convert",      # colour conversion
+    "inference",    # hands.process (keyframes)
+    "flow",         # optical-flow landmark propagation (between keyframes)
+    "gestures",     # features + gesture engine
+    "inject",       # one OS input call (dispatcher thread)
+    "qimage",       # preview scaling + QImage emit
+    "render",       # MainWindow.update_frame (GUI thread)
+    "end_to_end",   # capture -> cursor move applied
+)
+
+# Histogram bucket upper edges in milliseconds (last bucket is open ended)
+HIST_EDGES_MS = (1, 2, 4, 8, 16, 33, 66, 133, 266)
+
+
+class RollingStat:
+    # Fixed-size ring of the most recent samples (seconds). Recording is a
+    # list store and an index bump; percentiles are only computed when a
+    # snapshot is taken.
+
+    def __init__(self, window=512):
+        self.samples = [0.0] * window
+        self.window = window
+        self.index = 0
+        self.count = 0
+
+    def record(self, value):
+        self.samples[self.index] = value
+        self.index = (self.index + 1) % self.window
+        self.count += 1
+
+    def summary(self):
+        # numpy only when a snapshot is taken, so importing metrics (which
+        # nearly everything does) stays cheap at startup
+        import numpy as np
+        n = min(self.count, self.window)
+        if n == 0:
+            return {"count": 0, "mean": None, "p50": None, "p95": None, "p99": None,
+                    "hist": [0] * (len(HIST_EDGES_MS) + 1)}
+        ms = np.asarray(self.samples[:n]) * 1000.0
+        p50, p95, p99 = np.percentile(ms, (50, 95, 99)).tolist()
+        hist = np.bincount(np.searchsorted(HIST_EDGES_MS, ms), minlength=len(HIST_EDGES_MS) + 1)
+        return {"count": self.count, "mean": float(ms.mean()), "p50": p50, "p95": p95, "p99": p99,
+                "hist": hist.tolist()}
+
+
+class PipelineMetrics:
+    # Shared by the capture thread, vision loop, input dispatcher and GUI.
+    # Each stage has a single writer, so no locking is needed on the hot path.
+
+    def __init__(self, window=512):
+        self.stats = {name: RollingStat(window) for name in STAGES}
+        self.counters = {}
+        self.started = now()
+        self.startup = None     # startup.StartupTimer.summary() once the first frame is out
+
+    def record(self, stage, seconds):
+        self.stats[stage].record(seconds)
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def set(self, name, value):
+        self.counters[name] = value
+
+    def snapshot(self):
+        return {
+            "uptime_s": now() - self.started,
+            "stages": {name: stat.summary() for name, stat in self.stats.items()},
+            "counters": dict(self.counters),
+            "startup": self.startup,
+            "hist_edges_ms": list(HIST_EDGES_MS),
+        }
+
+    def export_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+    def export_csv(self, path):
+        snap = self.snapshot()
+        edges = [f"le_{e}ms" for e in HIST_EDGES_MS] + [f"gt_{HIST_EDGES_MS[-1]}ms"]
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["stage", "count", "mean_ms", "p50_ms", "p95_ms", "p99_ms"] + edges)
+            for name, s in snap["stages"].items():
+                writer.writerow([name, s["count"], s["mean"], s["p50"], s["p95"], s["p99"]] + s["hist"])
+            for name, value in snap["counters"].items():
+                writer.writerow([name, value])
+
+    def format_overlay(self):
+        # Compact text block for the dashboard sidebar
+        snap = self.snapshot()
+        lines = [f"{'stage':<10}{'p50':>6}{'p95':>6}{'p99':>6}"]
+        for name, s in snap["stages"].items():
+            if s["count"]:
+                lines.append(f"{name:<10}{s['p50']:>6.1f}{s['p95']:>6.1f}{s['p99']:>6.1f}")
+        for name, value in snap["counters"].items():
+            lines.append(f"{name}: {value}")
+        return "\n".join(lines)
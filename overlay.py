@@ -0,0 +1,35 @@
+# overlay.py
+
+# Skeleton edges of the 21-point hand model (same as MediaPipe's
+# HAND_CONNECTIONS, kept here so the window can draw without MediaPipe
+# or numpy)
+HAND_CONNECTIONS = (
+    (0, 1), (1, 2), (2, 3), (3, 4),
+    (0, 5), (5, 6), (6, 7), (7, 8),
+    (5, 9), (9, 10), (10, 11), (11, 12),
+    (9, 13), (13, 14), (14, 15), (15, 16),
+    (13, 17), (0, 17), (17, 18), (18, 19), (19, 20),
+)
+
+
+class Overlay:
+    # Compact per-frame annotations in frame pixels, painted by the UI on
+    # top of the preview at display resolution (see preview.PreviewLabel).
+    # Only built for frames that are actually shown.
+
+    def __init__(self, w, h):
+        self.w, self.h = w, h
+        self.hands = None           # (n, 21, 2) float32 copy of the landmarks
+        self.target = None          # index of the hand driving the cursor
+        self.lines = []             # (x1, y1, x2, y2, color)
+        self.points = []            # (x, y, radius, color)
+
+    def set_hands(self, hands, target=None):
+        self.hands = hands.points[:hands.count, :, :2].copy()
+        self.target = target
+
+    def line(self, p1, p2, color):
+        self.lines.append((p1[0], p1[1], p2[0], p2[1], color))
+
+    def point(self, p, radius, color):
+        self.points.append((p[0], p[1], radius, color))
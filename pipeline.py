@@ -0,0 +1,263 @@
+# pipeline.py
+from filters import CursorFilter
+from cursor import ScreenMapper, CursorEngine
+from gestures import GestureFrame, build_engine, needs_precision
+from features import HandLandmarks, FrameFeatures
+from roi import RoiTracker
+from inference_proc import InferenceProcess
+from tracking import LandmarkPropagator
+from overlay import Overlay
+from preprocess import FramePreprocessor
+from governor import IdleGovernor, QualityGovernor
+from status import UiEvent
+from metrics import PipelineMetrics, now
+
+
+class GesturePipeline:
+    # Everything between "camera frame arrived" and "input events posted",
+    # without any Qt. VideoWorker drives it from the live camera; the replay
+    # driver and the benchmarks drive it from recordings.
+
+    def __init__(self, settings, input_dispatcher, on_event, metrics=None, volume=None,
+                 monitors=None, clock=now, bus=None):
+        self.settings = settings
+        self.input = input_dispatcher
+        self.on_event = on_event    # status.UiEvent callback (window actions)
+        self.metrics = metrics if metrics is not None else PipelineMetrics()
+
+        # Cursor path: filter -> screen mapping -> high-rate output
+        self.cursor_filter = CursorFilter.from_settings(settings, clock)
+        self.plocX, self.plocY = 0, 0
+        self.frame_r = 100
+        self.mapper = ScreenMapper(settings["cursor_monitor"], self.frame_r, monitors)
+        self.cursor = CursorEngine(input_dispatcher, settings["cursor_rate_hz"],
+                                   settings["cursor_output"], clamp=self.mapper.clamp)
+
+        # volume.VolumeController or None
+        self.volume = volume
+        # bus.EventBus or None: landmarks, cursor, statuses and gesture
+        # events for other processes
+        self.bus = bus
+
+        # State Variables
+        self.active_hand_label = "Right"
+
+        # Feature Flags
+        self.gestures = {
+            "move": True,
+            "drag": True,
+            "right_click": True,
+            "left_click": True,
+            "back": True,
+            "four_finger": True,
+            "volume": True,
+            "sleep": True
+        }
+
+        # Inference, flow and ROI work on the raw (unmirrored) camera image;
+        # gestures, overlay and recordings see the mirrored selfie view
+        self.raw_hands = HandLandmarks(max_hands=2)
+        self.hands = HandLandmarks(max_hands=2)
+        self.preprocessor = FramePreprocessor()
+        self.features = FrameFeatures(max_hands=2)
+        self.roi = RoiTracker.from_settings(settings)
+        self.flow = LandmarkPropagator.from_settings(settings)
+        self.governor = IdleGovernor.from_settings(settings)
+        self.quality = QualityGovernor.from_settings(settings)
+        self.asleep = False     # toggled by the sleep gesture; only it is evaluated meanwhile
+        # Gesture state machine (timers, debounce, drag/pinch state)
+        self.gesture_engine = build_engine(self)
+        if bus:
+            self.gesture_engine.listener = bus.gesture
+
+        self.model = None       # MediaPipe Hands or InferenceProcess, built on the first frame
+        self.model_config = None    # (max_hands, complexity) the local model was built with
+        self.model_builds = 0
+        self.recorder = None    # replay.Recorder while recording
+
+        # Set per frame by the caller; the last frame's annotations end up
+        # in self.overlay (None when not wanted)
+        self.want_overlay = False
+        self.overlay = None
+        # One-off status of the last frame (see GestureFrame.event), or None
+        self.status_event = None
+
+    def apply_settings(self, settings):
+        # A new settings snapshot, between two frames. Everything is
+        # reconfigured in place; the model, camera and tracking state stay.
+        self.settings = settings
+        self.cursor_filter.configure(settings)
+        self.mapper.select(settings["cursor_monitor"])
+        self.roi.configure(settings)
+        self.flow.configure(settings)
+        self.governor.configure(settings)
+        self.quality.configure(settings)
+        if self.volume:
+            self.volume.configure(settings)
+        if self.bus:
+            self.bus.configure(settings)
+
+    def start(self):
+        self.cursor.start()
+
+    def stop(self):
+        self.cursor.stop()
+        if isinstance(self.model, InferenceProcess):
+            self.model.close()
+        if self.recorder:
+            self.recorder.close()
+            self.recorder = None
+
+    def toggle_sleep(self):
+        self.asleep = not self.asleep
+        self.gesture_engine.solo = "sleep" if self.asleep else None
+        self.on_event(UiEvent.TOGGLE_SLEEP)
+
+    def move_cursor(self, x, y, t_capture):
+        x, y = self.cursor_filter.update(x, y, t_capture)
+        # Prediction can overshoot the screen edge
+        self.plocX, self.plocY = self.mapper.clamp(x, y)
+        self.cursor.submit(self.plocX, self.plocY, t_capture)
+
+    def load_model(self):
+        # VideoWorker calls this during warm-up; otherwise the first frame does
+        if self.settings["inference_process"]:
+            self.model = InferenceProcess(self.settings["roi_max_input"], self.settings["inference_slots"],
+                                          pipelined=self.settings["inference_pipelined"],
+                                          max_restarts=self.settings["inference_max_restarts"])
+            return
+        self._build_model()
+
+    def _build_model(self):
+        # Imported here so landmark replays and benchmarks run without
+        # MediaPipe installed
+        import mediapipe as mp
+        if self.model is not None:
+            self.model.close()
+        self.model_config = self.quality.config()
+        max_hands, complexity = self.model_config
+        self.model = mp.solutions.hands.Hands(max_num_hands=max_hands, model_complexity=complexity,
+                                              min_detection_confidence=0.7)
+        self.model_builds += 1
+
+    def _infer(self, rgb_frame, t_capture, w, h):
+        # Two hands only when an enabled gesture needs them
+        q = self.quality
+        two = self.wants_two_hands()
+        q.max_hands = 2 if two else 1
+
+        if isinstance(self.model, InferenceProcess):
+            # rgb_frame already lives in the child's shared-memory slot
+            self.model.infer(self.raw_hands, self.roi.select(t_capture, two), q.max_hands, q.complexity,
+                             q.scale, t_capture)
+            return
+        if self.model_config != q.config():
+            self._build_model()
+        model_input, roi = self.roi.prepare(rgb_frame, t_capture, two, q.scale)
+        self.raw_hands.load_mediapipe(self.model.process(model_input), w, h, roi)
+
+    def _infer_pipelined(self, rgb_frame, t_capture, precise):
+        # Inference process, pipelined: the request sent on the previous
+        # frame is collected here, keyframed on the frame it was made for
+        # and carried forward to this one by flow (with flow off the
+        # landmarks stay one frame old). A new request goes out when flow
+        # would have inferred this frame; the child then works on it while
+        # the next frame is captured and converted.
+        model = self.model
+        in_flight = model.pending is not None
+        fresh = model.collect(self.raw_hands)
+        if fresh is None and in_flight:
+            # Timed out or stale: no hands rather than the last frame's
+            # landmarks a second time (as infer() does), and nothing for
+            # flow to carry, so this frame is sent again
+            self.raw_hands.count = 0
+            self.flow.tracking = False
+        if fresh is not None:
+            self.flow.keyframe(fresh[0], self.raw_hands, fresh[1])
+            if self.flow.tracking:
+                self.flow.propagate(rgb_frame, self.raw_hands, t_capture)
+            tracked = True
+        else:
+            tracked = not self.flow.should_infer(precise) and self.flow.propagate(rgb_frame, self.raw_hands,
+                                                                                  t_capture)
+        if not tracked or self.flow.should_infer(precise):
+            q = self.quality
+            two = self.wants_two_hands()
+            q.max_hands = 2 if two else 1
+            model.submit(t_capture, self.roi.select(t_capture, two), q.max_hands, q.complexity, q.scale)
+        return "inference" if fresh is not None else "flow"
+
+    def process_frame(self, frame, t_capture):
+        # Raw BGR camera frame in; returns (frame, rgb frame, status). Neither
+        # frame is mirrored, the preview flips its own scaled copy
+        if isinstance(self.model, InferenceProcess) and self.model.failed:
+            # The child kept dying: carry on with MediaPipe in this process
+            self.model.close()
+            self.model = None
+            self._build_model()
+        if self.model is None:
+            self.load_model()
+        if self.recorder:
+            self.recorder.add_frame(t_capture, frame)
+        t0 = now()
+
+        # Idle: nothing but the motion check until something moves
+        awake = self.governor.gate(frame, t_capture)
+
+        h, w, c = frame.shape
+        dst = self.model.frame_buffer(h, w) if isinstance(self.model, InferenceProcess) else None
+        rgb_frame = self.preprocessor.to_rgb(frame, dst)
+        t1 = now()
+        self.metrics.record("convert", t1 - t0)
+        if not awake:
+            self.overlay = None
+            self.status_event = None
+            return frame, rgb_frame, ("Standby", "#888888")
+
+        # Keyframe or propagate. Pending clicks always get fresh landmarks;
+        # self.features still holds the previous frame here.
+        precise = needs_precision(self.gesture_engine, self.features)
+        pipelined = isinstance(self.model, InferenceProcess) and self.model.pipelined
+        if pipelined:
+            stage = self._infer_pipelined(rgb_frame, t_capture, precise)
+        elif self.flow.should_infer(precise) or not self.flow.propagate(rgb_frame, self.raw_hands, t_capture):
+            self._infer(rgb_frame, t_capture, w, h)
+            self.flow.keyframe(rgb_frame, self.raw_hands, t_capture)
+            stage = "inference"
+        else:
+            stage = "flow"
+        t2 = now()
+        if stage == "inference":
+            # Pipelined, the wait in collect() hides the child's cost
+            self.quality.record(t_capture, self.model.round_trip if pipelined else t2 - t1)
+
+        self.roi.update(self.raw_hands, w, h, t_capture)
+        self.hands.mirror_from(self.raw_hands, w)
+        self.overlay = Overlay(w, h) if self.want_overlay else None
+        status = self.process_landmarks(t_capture, w, h, self.overlay)
+        self.governor.update(t_capture, self.hands.count)
+
+        m = self.metrics
+        m.record(stage, t2 - t1)
+        m.record("gestures", now() - t2)
+        return frame, rgb_frame, status
+
+    def wants_two_hands(self):
+        return self.gestures["volume"] or self.gestures["sleep"]
+
+    def process_landmarks(self, t_capture, w, h, overlay=None):
+        # Gesture stage only; self.hands must already hold this frame's
+        # mirrored landmarks (from MediaPipe or a recording)
+        if self.recorder:
+            self.recorder.add_landmarks(t_capture, self.hands, w, h)
+        self.features.compute(self.hands)
+        gesture_frame = GestureFrame(self.hands, self.features, t_capture, w, h, overlay, self.active_hand_label)
+        if overlay is not None:
+            overlay.set_hands(self.hands, gesture_frame.target)
+        status = self.gesture_engine.update(gesture_frame)
+        self.status_event = gesture_frame.event
+        if self.asleep:
+            status = ("Sleeping", "#aaaaaa")
+        if self.bus:
+            self.bus.end_frame(t_capture, self.hands, w, h, (self.plocX, self.plocY), status)
+        return status
@@ -0,0 +1,24 @@
+# preprocess.py
+import cv2
+import numpy as np
+
+
+class FramePreprocessor:
+    # Camera frame -> RGB model input with no per-frame allocation. The
+    # output buffer is reused while the frame size stays the same, or the
+    # caller passes its own (a shared-memory slot in inference-process
+    # mode). There is no horizontal flip: the model sees the raw image and
+    # the landmarks are mirrored afterwards (HandLandmarks.mirror_from),
+    # which is 126 floats instead of a full frame.
+
+    def __init__(self):
+        self.rgb = None
+        self.allocations = 0
+
+    def to_rgb(self, bgr_frame, dst=None):
+        if dst is None:
+            if self.rgb is None or self.rgb.shape != bgr_frame.shape:
+                self.rgb = np.empty_like(bgr_frame)
+                self.allocations += 1
+            dst = self.rgb
+        return cv2.cvtColor(bgr_frame, cv2.COLOR_BGR2RGB, dst=dst)
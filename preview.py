@@ -0,0 +1,148 @@
+# preview.py
+import threading
+from PySide6.QtCore import Qt, QLineF, QPointF
+from PySide6.QtGui import QImage, QPainter, QPen, QColor
+from PySide6.QtWidgets import QLabel
+from overlay import HAND_CONNECTIONS
+
+
+class PreviewPipeline:
+    # Camera preview, produced on the vision thread:
+    #   - frames are scaled in the worker to the size the label shows them
+    #     at (aspect kept), so the GUI thread only uploads a pixmap
+    #   - scaled frames land in a small pool of owned buffers; a buffer goes
+    #     back to the pool once the GUI has turned it into a pixmap, and a
+    #     frame is skipped while none is free (GUI running behind)
+    #   - preview fps is capped separately from tracking fps
+    #   - nothing is produced while the window is minimized or hidden
+
+    def __init__(self, max_fps=30, pool_size=3):
+        self.max_fps = max_fps
+        self.display_hz = 0         # set by the GUI; caps max_fps when known
+        self.target = (0, 0)        # device pixels
+        self.ratio = 1.0
+        self.visible = True
+        self.next_t = None          # deadline for the next preview frame
+
+        self._lock = threading.Lock()
+        self._buffers = [None] * pool_size
+        self._free = list(range(pool_size))
+
+        # Counters
+        self.frames_shown = 0
+        self.frames_skipped = 0
+        self.allocations = 0
+
+    def set_target(self, w, h, ratio=1.0):
+        # Called from the GUI thread when the preview label resizes
+        self.ratio = ratio
+        self.target = (int(w * ratio), int(h * ratio))
+
+    def set_visible(self, visible):
+        self.visible = visible
+
+    def set_max_fps(self, fps):
+        self.max_fps = min(fps, self.display_hz) if self.display_hz > 0 and fps > 0 else fps
+
+    def wants_frame(self, t):
+        # Paced against a deadline that advances by one interval per shown
+        # frame, with a quarter interval of slack: camera jitter (a frame a
+        # millisecond early) does not skip it when preview_fps matches the
+        # camera rate, and the slack never accumulates into a higher rate
+        w, h = self.target
+        if not self.visible or w <= 0 or h <= 0:
+            return False
+        return self.max_fps <= 0 or self.next_t is None or t >= self.next_t - 0.25 / self.max_fps
+
+    def _advance(self, t):
+        if self.max_fps <= 0:
+            return
+        interval = 1.0 / self.max_fps
+        if self.next_t is None or t - self.next_t > interval:
+            self.next_t = t + interval      # behind (or first frame): resync
+        else:
+            self.next_t += interval
+
+    def render(self, rgb_frame, t):
+        # Returns (QImage, buffer index) or None; the GUI must hand the
+        # index back through release() once it no longer needs the image.
+        # cv2/numpy are imported here, on the vision thread, so importing
+        # this module for PreviewLabel does not hold up the window.
+        import cv2
+        import numpy as np
+        with self._lock:
+            if not self._free:
+                self.frames_skipped += 1
+                return None
+            i = self._free.pop()
+
+        fh, fw = rgb_frame.shape[:2]
+        tw, th = self.target
+        s = min(tw / fw, th / fh)
+        size = (max(1, int(fw * s)), max(1, int(fh * s)))
+        buf = self._buffers[i]
+        if buf is None or buf.shape[1::-1] != size:
+            buf = self._buffers[i] = np.empty((size[1], size[0], 3), np.uint8)
+            self.allocations += 1
+        cv2.resize(rgb_frame, size, dst=buf, interpolation=cv2.INTER_AREA if s < 1 else cv2.INTER_LINEAR)
+        cv2.flip(buf, 1, dst=buf)
+
+        qimg = QImage(buf.data, size[0], size[1], size[0] * 3, QImage.Format_RGB888)
+        qimg.setDevicePixelRatio(self.ratio)
+        self._advance(t)
+        self.frames_shown += 1
+        return qimg, i
+
+    def release(self, i):
+        with self._lock:
+            self._free.append(i)
+
+
+class PreviewLabel(QLabel):
+    # Shows the pre-scaled preview and paints the frame's overlay.Overlay
+    # on top with QPainter, at display resolution
+
+    def __init__(self):
+        super().__init__()
+        self.overlay = None
+
+    def set_frame(self, pixmap, overlay=None):
+        self.overlay = overlay
+        self.setPixmap(pixmap)
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        ov = self.overlay
+        pix = self.pixmap()
+        if ov is None or pix.isNull():
+            return
+        size = pix.deviceIndependentSize()
+        s = size.width() / ov.w
+
+        p = QPainter(self)
+        p.setRenderHint(QPainter.Antialiasing)
+        p.translate((self.width() - size.width()) / 2, (self.height() - size.height()) / 2)
+        p.scale(s, s)
+
+        def pen(color, width=2):
+            pen = QPen(QColor(color), width)
+            pen.setCosmetic(True)   # width in screen pixels whatever the scale
+            return pen
+
+        if ov.hands is not None:
+            for pts in ov.hands.tolist():
+                p.setPen(pen("#e0e0e0"))
+                p.drawLines([QLineF(*pts[a], *pts[b]) for a, b in HAND_CONNECTIONS])
+                p.setPen(Qt.NoPen)
+                p.setBrush(QColor("#ff0000"))
+                for x, y in pts:
+                    p.drawEllipse(QPointF(x, y), 3 / s, 3 / s)
+
+        for x1, y1, x2, y2, color in ov.lines:
+            p.setPen(pen(color))
+            p.drawLine(QLineF(x1, y1, x2, y2))
+        p.setBrush(Qt.NoBrush)
+        for x, y, r, color in ov.points:
+            p.setPen(pen(color, 3))
+            p.drawEllipse(QPointF(x, y), r / s, r / s)
+        p.end()
@@ -0,0 +1,84 @@
+# recording.py
+import json
+import struct
+
+# On-disk layout (little endian):
+#   MAGIC, HEADER(width, height, settings_len), then settings_len bytes of
+#   JSON: the settings the session started with, so a replay runs with
+#   the same thresholds on any machine (empty object = not known)
+#   then records: RECORD(t, kind, payload_len) + payload
+#     landmarks payload: n_hands (u8), n label ids (u8), n * 21 * 3 float32
+#                        (x, y in frame pixels, z scaled by width)
+#     frame payload:     JPEG bytes of the raw (unflipped) camera frame
+# t is seconds since the first record.
+
+MAGIC = b"AVMREC2\n"
+HEADER = struct.Struct("<HHI")
+MAGIC_V1 = b"AVMREC1\n"     # no settings block; still read
+HEADER_V1 = struct.Struct("<HH")
+RECORD = struct.Struct("<dBI")
+KIND_LANDMARKS, KIND_FRAME = 0, 1
+LABELS = ("Left", "Right")
+FLOATS_PER_HAND = 21 * 3
+
+
+class RecordingWriter:
+    def __init__(self, path, w, h, settings=None):
+        blob = json.dumps(dict(settings or {})).encode()
+        self.f = open(path, "wb")
+        self.f.write(MAGIC + HEADER.pack(w, h, len(blob)) + blob)
+        self.t0 = None
+
+    def _write(self, t, kind, payload):
+        if self.t0 is None:
+            self.t0 = t
+        self.f.write(RECORD.pack(t - self.t0, kind, len(payload)))
+        self.f.write(payload)
+
+    def write_landmarks(self, t, labels, points):
+        # points: bytes of len(labels) * 63 little-endian float32
+        head = bytes([len(labels)] + [LABELS.index(label) for label in labels])
+        self._write(t, KIND_LANDMARKS, head + points)
+
+    def write_frame(self, t, jpeg):
+        self._write(t, KIND_FRAME, bytes(jpeg))
+
+    def close(self):
+        if self.f:
+            self.f.close()
+            self.f = None
+
+
+def read_recording(path):
+    # Returns (w, h, settings, records); settings is a dict, empty when the
+    # recording does not carry them. records are (t, kind, data):
+    #   landmarks -> (labels, float32 bytes), frame -> JPEG bytes
+    with open(path, "rb") as f:
+        blob = f.read()
+    if blob.startswith(MAGIC):
+        pos = len(MAGIC)
+        w, h, size = HEADER.unpack_from(blob, pos)
+        pos += HEADER.size
+        settings = json.loads(blob[pos:pos + size])
+        pos += size
+    elif blob.startswith(MAGIC_V1):
+        pos = len(MAGIC_V1)
+        w, h = HEADER_V1.unpack_from(blob, pos)
+        pos += HEADER_V1.size
+        settings = {}
+    else:
+        raise ValueError(f"{path} is not an AVM recording")
+
+    records = []
+    while pos < len(blob):
+        t, kind, size = RECORD.unpack_from(blob, pos)
+        pos += RECORD.size
+        payload = blob[pos:pos + size]
+        pos += size
+        if kind == KIND_LANDMARKS:
+            n = payload[0]
+            labels = [LABELS[i] for i in payload[1:1 + n]]
+            records.append((t, kind, (labels, payload[1 + n:])))
+        else:
+            records.append((t, kind, payload))
+    return w, h, settings, records
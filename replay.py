@@ -0,0 +1,248 @@
+# replay.py
+import math
+import random
+import cv2
+import numpy as np
+from recording import RecordingWriter, read_recording, KIND_LANDMARKS, KIND_FRAME
+from input_dispatch import InputDispatcher, RecordingBackend
+from pipeline import GesturePipeline
+from overlay import HAND_CONNECTIONS
+from settings import DEFAULTS, validate
+
+
+class Recorder:
+    # Hooked into GesturePipeline while recording. "landmarks" stores the
+    # MediaPipe output per frame (small, replays without MediaPipe);
+    # "frames" stores JPEG camera frames (replays through inference too);
+    # "both" stores both. settings (the snapshot at the start) go into the
+    # header for the replay.
+
+    def __init__(self, path, mode="landmarks", jpeg_quality=90, settings=None):
+        self.path = path
+        self.mode = mode
+        self.settings = settings
+        self.jpeg_params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
+        self.writer = None
+
+    def _open(self, w, h):
+        if self.writer is None:
+            self.writer = RecordingWriter(self.path, w, h, self.settings)
+        return self.writer
+
+    def add_frame(self, t, frame):
+        if self.mode in ("frames", "both"):
+            h, w = frame.shape[:2]
+            ok, jpeg = cv2.imencode(".jpg", frame, self.jpeg_params)
+            if ok:
+                self._open(w, h).write_frame(t, jpeg.tobytes())
+
+    def add_landmarks(self, t, hands, w, h):
+        if self.mode in ("landmarks", "both"):
+            points = hands.points[:hands.count].astype("<f4").tobytes()
+            self._open(w, h).write_landmarks(t, hands.labels[:hands.count], points)
+
+    def close(self):
+        if self.writer:
+            self.writer.close()
+
+
+class Recording:
+    def __init__(self, path):
+        self.path = path
+        self.w, self.h, self.settings, self.records = read_recording(path)
+        self.has_frames = any(kind == KIND_FRAME for _, kind, _ in self.records)
+        self.has_landmarks = any(kind == KIND_LANDMARKS for _, kind, _ in self.records)
+
+    def __len__(self):
+        return len(self.records)
+
+
+class ReplayResult:
+    def __init__(self, frames, events, statuses, ui_events=()):
+        self.frames = frames
+        self.events = events        # [(name, args)] as seen by the input backend
+        self.statuses = statuses    # [(text, color)] per frame
+        self.ui_events = list(ui_events)    # status.UiEvent in order
+
+    def summary(self):
+        counts = {}
+        for name, _ in self.events:
+            counts[name] = counts.get(name, 0) + 1
+        return counts
+
+
+class ReplayDriver:
+    # Feeds a recording through the same GesturePipeline the live worker
+    # uses, headless and deterministic:
+    #   - the input dispatcher is never started; queued events are drained
+    #     into a RecordingBackend after every frame
+    #   - the cursor output engine runs as a pass-through
+    #   - the filters' clock follows the recording with a fixed latency
+    #   - settings are the ones stored in the recording (DEFAULTS for keys
+    #     it lacks), never the local avm_settings.json, so a recording
+    #     gives the same events on every machine; `settings` overrides them
+
+    def __init__(self, settings=None, monitors=((0, 0, 1920, 1080),), latency=0.03):
+        self.overrides = dict(settings or {})
+        self.monitors = list(monitors)
+        self.latency = latency
+        self._t = 0.0
+
+        self.backend = RecordingBackend()
+        self.input = InputDispatcher(self.backend)
+        self.statuses = []
+        self.ui_events = []
+        self.settings = None
+        self.pipeline = None
+
+    def _clock(self):
+        return self._t + self.latency
+
+    def _build(self, recorded):
+        settings, _ = validate({**recorded, **self.overrides})
+        settings["cursor_rate_hz"] = 0
+        settings["inference_process"] = False
+        self.settings = settings
+        self.pipeline = GesturePipeline(settings, self.input, self.ui_events.append,
+                                        monitors=self.monitors, clock=self._clock)
+
+    def run(self, recording, use_frames=None):
+        self._build(recording.settings)
+        if use_frames is None:
+            use_frames = not recording.has_landmarks
+        kind_wanted = KIND_FRAME if use_frames else KIND_LANDMARKS
+        pipeline = self.pipeline
+        w, h = recording.w, recording.h
+        frames = 0
+
+        for t, kind, data in recording.records:
+            if kind != kind_wanted:
+                continue
+            self._t = t
+            if use_frames:
+                frame = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+                _, _, status = pipeline.process_frame(frame, t)
+            else:
+                labels, raw = data
+                points = np.frombuffer(raw, "<f4").reshape(len(labels), 21, 3)
+                pipeline.hands.load(points, labels)
+                status = pipeline.process_landmarks(t, w, h)
+            self.statuses.append(status)
+            self.input.drain()
+            frames += 1
+
+        events = [(name, args) for _, name, args in self.backend.events]
+        return ReplayResult(frames, events, self.statuses, self.ui_events)
+
+
+def replay(path, settings=None, use_frames=None):
+    return ReplayDriver(settings).run(Recording(path), use_frames)
+
+
+# --- SYNTHETIC SESSIONS ---
+# Deterministic landmark streams for the checked-in baselines. The hand
+# model is crude but produces the finger states and distances the gesture
+# engine looks at.
+
+def _synthetic_hand(x, y, fingers, pinch=False, rng=None):
+    pts = [None] * 21
+    pts[0] = (x, y + 100)
+    # Thumb
+    pts[1] = (x - 25, y + 70)
+    pts[2] = (x - 40, y + 45)
+    if fingers[0]:
+        pts[3], pts[4] = (x - 50, y + 20), (x - 58, y)
+    else:
+        pts[3], pts[4] = (x - 30, y + 30), (x - 15, y + 40)
+    # Index .. little
+    for i, mcp in enumerate((5, 9, 13, 17)):
+        fx = x - 20 + i * 22
+        pts[mcp] = (fx, y)
+        if fingers[i + 1]:
+            pts[mcp + 1], pts[mcp + 2], pts[mcp + 3] = (fx, y - 30), (fx, y - 50), (fx, y - 65)
+        else:
+            pts[mcp + 1], pts[mcp + 2], pts[mcp + 3] = (fx, y - 25), (fx + 3, y - 10), (fx + 3, y + 5)
+    if pinch:
+        tx, ty = pts[8]
+        pts[3], pts[4] = (tx - 15, ty + 20), (tx - 6, ty + 6)
+
+    out = []
+    for px, py in pts:
+        if rng:
+            px += rng.gauss(0, 0.7)
+            py += rng.gauss(0, 0.7)
+        out.append((px, py, 0.0))
+    return out
+
+
+def synthesize_session(fps=30, seed=7):
+    # Returns (w, h, frames) with frames as (t, labels, hands)
+    rng = random.Random(seed)
+    frames = []
+    t = [0.0]
+
+    def emit(n, make):
+        for i in range(n):
+            labels, hands = make(i, n)
+            frames.append((t[0], labels, [_synthetic_hand(*hand, rng=rng) for hand in hands]))
+            t[0] += 1.0 / fps
+
+    index = (0, 1, 0, 0, 0)
+
+    def circle(i, n):
+        a = 2 * math.pi * i / n
+        return ["Right"], [(320 + 120 * math.cos(a), 240 + 80 * math.sin(a), index)]
+
+    def still(fingers, pinch=False, x=320, y=240):
+        return lambda i, n: (["Right"], [(x, y, fingers, pinch)])
+
+    emit(90, circle)                                   # move
+    emit(3, still(index, pinch=True))                  # quick pinch -> double click
+    emit(15, still(index))
+    emit(12, still(index, pinch=True))                 # long pinch -> click
+    emit(15, still(index))
+    emit(45, lambda i, n: (["Right"], [(260 + 3 * i, 240, (0, 0, 0, 0, 0))]))   # drag
+    emit(10, still(index, x=395))                      # drop
+    emit(36, still((0, 1, 1, 1, 0)))                   # back
+    emit(18, still((0, 1, 1, 0, 0)))                   # right click
+    emit(15, still((0, 1, 1, 1, 1)))                   # toggle UI
+    emit(30, lambda i, n: ([], []))                    # no hands
+    emit(60, lambda i, n: (["Right", "Left"],          # volume
+                           [(380 + i, 240, index), (200 - i, 240, index)]))
+    emit(15, lambda i, n: (["Right", "Left"],          # wrists crossed
+                           [(300, 240, (1, 0, 0, 0, 0)), (330, 240, (1, 0, 0, 0, 0))]))
+    emit(15, lambda i, n: ([], []))
+    return 640, 480, frames
+
+
+def render_synthetic(w, h, hands, background):
+    # Camera frame for a synthetic hand set: skin-coloured skeletons on a
+    # plain background. Landmarks are in the mirrored view; recordings keep
+    # the raw camera frame, so the drawing is flipped back.
+    frame = background.copy()
+    for hand in hands:
+        pts = [(int(w - 1 - x), int(y)) for x, y, _ in hand]
+        for a, b in HAND_CONNECTIONS:
+            cv2.line(frame, pts[a], pts[b], (140, 170, 220), 9, cv2.LINE_AA)
+        for p in pts:
+            cv2.circle(frame, p, 6, (120, 150, 205), -1, cv2.LINE_AA)
+    return frame
+
+
+def write_synthetic(path, fps=30, seed=7, mode="landmarks", jpeg_quality=60):
+    # mode "both" also stores rendered JPEG frames, so the replay can run
+    # the whole process_frame path (preprocess, ROI, flow, inference)
+    w, h, frames = synthesize_session(fps, seed)
+    writer = RecordingWriter(path, w, h, DEFAULTS)
+    if mode in ("frames", "both"):
+        background = np.full((h, w, 3), 80, np.uint8)
+        params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
+    for t, labels, hands in frames:
+        if mode in ("frames", "both"):
+            ok, jpeg = cv2.imencode(".jpg", render_synthetic(w, h, hands, background), params)
+            writer.write_frame(t, jpeg.tobytes())
+        if mode in ("landmarks", "both"):
+            points = np.asarray(hands, "<f4").reshape(len(hands), 21, 3).tobytes()
+            writer.write_landmarks(t, labels, points)
+    writer.close()
+    return len(frames)
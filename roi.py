@@ -0,0 +1,127 @@
+# roi.py
+import cv2
+import numpy as np
+
+
+def crop_input(rgb_frame, roi, max_input, scale=1.0):
+    # Model input for roi (None = whole frame), at most max_input * scale
+    # pixels a side; whole frames are just scaled
+    if roi is None:
+        if scale >= 1.0:
+            return rgb_frame
+        h, w = rgb_frame.shape[:2]
+        return cv2.resize(rgb_frame, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+    max_input *= scale
+    x0, y0, x1, y1 = roi
+    crop = rgb_frame[y0:y1, x0:x1]
+    side = max(x1 - x0, y1 - y0)
+    if side > max_input:
+        s = max_input / side
+        return cv2.resize(crop, (max(1, int((x1 - x0) * s)), max(1, int((y1 - y0) * s))),
+                          interpolation=cv2.INTER_AREA)
+    return np.ascontiguousarray(crop)
+
+
+class RoiTracker:
+    # Picks the region of the frame MediaPipe actually needs to look at.
+    # While a hand is tracked the model gets a square crop around the last
+    # landmark box, padded by a margin that grows with hand speed, and
+    # downscaled to max_input pixels if it is larger. The crop only moves
+    # when the hand nears its edge, so MediaPipe's own frame-to-frame
+    # tracking sees a stable coordinate system.
+    #
+    # Full frame scans happen when:
+    #   - no hand was found in the last frame (tracking lost)
+    #   - two-hand gestures are enabled, fewer than two hands are tracked and
+    #     rescan_s has passed (a second hand may be entering)
+
+    def __init__(self, enabled=True, margin=0.35, motion_gain=1.5, max_input=320,
+                 rescan_s=0.5, min_side=120):
+        self.enabled = enabled
+        self.margin = margin
+        self.motion_gain = motion_gain
+        self.max_input = max_input
+        self.rescan_s = rescan_s
+        self.min_side = min_side
+
+        self.roi = None             # (x0, y0, x1, y1) in frame pixels
+        self.last_full = -1e9
+        self.last_center = None
+        self.last_t = None
+        self.speed = 0.0            # px/s of the box center
+        self.hands_tracked = 0
+
+        # Counters
+        self.full_scans = 0
+        self.crop_scans = 0
+
+    @classmethod
+    def from_settings(cls, settings):
+        tracker = cls()
+        tracker.configure(settings)
+        return tracker
+
+    def configure(self, settings):
+        # Also applied live; the current box is kept
+        self.enabled = settings["roi_enabled"]
+        self.margin = settings["roi_margin"]
+        self.max_input = settings["roi_max_input"]
+        self.rescan_s = settings["roi_rescan_s"]
+
+    def reset(self):
+        self.roi = None
+        self.last_center = None
+
+    def select(self, t, want_two_hands):
+        # Region for this frame's inference, None for a full frame scan
+        if (not self.enabled or self.roi is None or
+                (want_two_hands and t - self.last_full >= self.rescan_s and self.hands_tracked < 2)):
+            self.last_full = t
+            self.full_scans += 1
+            return None
+        self.crop_scans += 1
+        return self.roi
+
+    def prepare(self, rgb_frame, t, want_two_hands, scale=1.0):
+        # Returns (model input, roi) where roi is None for a full frame
+        roi = self.select(t, want_two_hands)
+        return crop_input(rgb_frame, roi, self.max_input, scale), roi
+
+    def update(self, hands, w, h, t):
+        # Called with the landmarks of this frame already in full-frame pixels
+        self.hands_tracked = hands.count
+        if hands.count == 0:
+            self.reset()
+            self.last_t = t
+            return
+
+        xy = hands.points[:hands.count, :, :2].reshape(-1, 2)
+        bx0, by0 = xy.min(axis=0).tolist()
+        bx1, by1 = xy.max(axis=0).tolist()
+        cx, cy = (bx0 + bx1) / 2, (by0 + by1) / 2
+
+        # Speed of the box center, smoothed
+        dt = 0.0
+        if self.last_center is not None and self.last_t is not None and t > self.last_t:
+            dt = t - self.last_t
+            v = np.hypot(cx - self.last_center[0], cy - self.last_center[1]) / dt
+            self.speed += (v - self.speed) * 0.5
+        self.last_center = (cx, cy)
+        self.last_t = t
+
+        # Keep the current crop while the box sits comfortably inside it
+        if self.roi is not None:
+            x0, y0, x1, y1 = self.roi
+            pad = 0.1 * (x1 - x0)
+            if (bx0 - pad >= x0 and by0 - pad >= y0 and bx1 + pad <= x1 and by1 + pad <= y1 and
+                    (bx1 - bx0) > 0.3 * (x1 - x0)):
+                return
+
+        side = max(bx1 - bx0, by1 - by0)
+        travel = self.speed * (dt or 1 / 30) * self.motion_gain
+        side = max(side * (1 + 2 * self.margin) + 2 * travel, self.min_side)
+        side = min(side, w, h)
+        half = side / 2
+        x0 = int(min(max(cx - half, 0), w - side))
+        y0 = int(min(max(cy - half, 0), h - side))
+        self.roi = (x0, y0, x0 + int(side), y0 + int(side))
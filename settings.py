@@ -0,0 +1,395 @@
+# settings.py
+import json
+import os
+import threading
+import time
+from types import MappingProxyType
+
+SETTINGS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "avm_settings.json")
+
+DEFAULTS = {
+    "smoothing_alpha": None,    # "exp" filter only; null = 1 / smoothing_level
+    "smoothing_level": 5,       # "Smoothing" slider, 1..20
+    "sensitivity": 1.5,         # "Cursor Sensitivity" slider, 1.0..3.0
+    "volume": 50.0,
+    "pinch_thresh": 0.35,
+    "volume_min_dist": None,
+    "volume_max_dist": None,
+
+    # Volume gesture: fingertip distance volume_min_dist..volume_max_dist
+    # (pixels, null = 50 / 300) -> 0..100% in volume_steps steps. Backend
+    # "auto" (pycaw on Windows, pactl/amixer elsewhere), "pycaw", "mixer"
+    # or "stub"; writes are capped to volume_rate_hz.
+    "volume_backend": "auto",
+    "volume_steps": 50,
+    "volume_hysteresis": 0.3,
+    "volume_rate_hz": 15,
+
+    # Camera / frame source: "camera", "file" (capture_path) or "synthetic".
+    # capture_fourcc "auto" negotiates the cheapest format for the mode;
+    # capture_probe measures every mode at startup and picks from that.
+    "capture_source": "camera",
+    "capture_index": 0,
+    "capture_path": None,
+    "capture_width": 640,
+    "capture_height": 480,
+    "capture_fps": 30,
+    "capture_fourcc": "auto",
+    "capture_buffer": 1,
+    "capture_probe": False,
+
+    # Cursor filter ("exp", "one_euro" or "kalman")
+    "cursor_filter": "one_euro",
+    "one_euro_min_cutoff": 1.0,
+    "one_euro_beta": 0.007,
+    "cursor_predict": True,
+    "predict_max_lead": 0.08,
+
+    # Cursor output; cursor_monitor is "all" or a monitor index (0 = primary).
+    # input_backend: "pyautogui", "raw" (SendInput / XTest, falls back to
+    # pyautogui) or "record" (no OS input, for tests)
+    "cursor_rate_hz": 144,
+    "cursor_output": "extrapolate",
+    "cursor_monitor": "all",
+    "input_backend": "pyautogui",
+
+    # Inference region of interest
+    "roi_enabled": True,
+    "roi_margin": 0.35,
+    "roi_max_input": 320,
+    "roi_rescan_s": 0.5,
+
+    # Keyframe mode: optical-flow landmark propagation between inferences
+    "flow_enabled": True,
+    "flow_max_interval": 4,
+    "flow_min_track": 0.8,
+    "flow_slow_px_s": 150,
+    "flow_fast_px_s": 900,
+
+    # Camera preview frame cap (also capped to the display refresh rate)
+    "preview_fps": 30,
+    "overlay_enabled": True,
+
+    # Low-power idle mode: no hand for idle_after_s -> only run the hand
+    # model once the motion detector fires. Frames keep being decoded at the
+    # camera rate, so waking takes 1-2 frames; idle_fps > 0 also throttles
+    # decoding while idle, at the price of up to 1 / idle_fps extra wake
+    # latency (200 ms at 5)
+    "idle_enabled": True,
+    "idle_after_s": 10.0,
+    "idle_fps": 0,
+    "idle_wake_grace_s": 2.0,
+    "motion_threshold": 12,
+    "motion_min_fraction": 0.01,
+
+    # Quality governor: steps model complexity / input scale to keep hand
+    # inference under latency_target_ms (quality_level 0 = best)
+    "quality_enabled": True,
+    "latency_target_ms": 25,
+    "quality_level": 0,
+
+    # Shortest time a status stays on screen; updates in between are merged
+    "status_interval": 0.1,
+
+    # Voice commands: "vosk" decodes offline against the command phrases
+    # only; "google" sends each phrase to the web API and is only used when
+    # chosen here. voice_model_path is a local vosk model directory,
+    # relative to the app folder (python voice.py --fetch-model puts the
+    # small en-us model there); nothing is downloaded at runtime
+    "voice_recognizer": "vosk",
+    "voice_model_path": "models/vosk-model-small-en-us-0.15",
+
+    # Voice input: the microphone, or a 16-bit mono WAV (voice_wav_path) for
+    # testing. An energy VAD cuts phrases: speech is voice_vad_ratio x the
+    # noise floor, voice_pre_roll_ms before the onset is kept and a phrase
+    # ends after voice_hangover_ms of silence
+    "voice_wav_path": None,
+    "voice_sample_rate": 16000,
+    "voice_vad_ratio": 3.0,
+    "voice_pre_roll_ms": 300,
+    "voice_hangover_ms": 400,
+    "voice_max_phrase_s": 4.0,
+
+    # Local event bus for other processes (see bus.py): a UNIX socket path
+    # or host:port (null = avm-bus.sock in the temp dir, or 127.0.0.1:47800
+    # without UNIX sockets). bus_batch_frames frames go into one batch; a
+    # subscriber more than bus_queue batches behind loses the oldest ones
+    "bus_enabled": False,
+    "bus_address": None,
+    "bus_queue": 64,
+    "bus_batch_frames": 1,
+
+    # Run MediaPipe in a child process fed through shared memory
+    "inference_process": False,
+    "inference_slots": 4,
+    # Overlap the child's inference of frame N with capture of frame N+1;
+    # its landmarks arrive one frame later and flow carries them forward
+    "inference_pipelined": True,
+    # A child that keeps dying is given up on after this many respawns in
+    # a row, and MediaPipe runs in-process instead
+    "inference_max_restarts": 3,
+
+    # Recording ("landmarks", "frames" or "both"); no recording when path is null
+    "record_path": None,
+    "record_mode": "landmarks",
+}
+
+
+# Value constraints on top of the type check. RANGES are inclusive
+# (None = open ended), CHOICES list the accepted strings, TYPES give the
+# accepted types where the default does not say (null defaults, and int
+# defaults that also take a fractional value). A value outside them falls
+# back to the default like a wrong type does.
+RANGES = {
+    "smoothing_alpha": (0.01, 1.0),
+    "smoothing_level": (1, 20),
+    "sensitivity": (1.0, 3.0),
+    "volume": (0.0, 100.0),
+    "pinch_thresh": (0.0, 1.0),
+    "volume_min_dist": (0, None),
+    "volume_max_dist": (1, None),
+    "volume_steps": (1, None),
+    "volume_hysteresis": (0.0, 1.0),
+    "volume_rate_hz": (1, None),
+    "capture_index": (0, None),
+    "capture_width": (1, None),
+    "capture_height": (1, None),
+    "capture_fps": (1, None),
+    "capture_buffer": (1, None),
+    "one_euro_min_cutoff": (0.0, None),
+    "one_euro_beta": (0.0, None),
+    "predict_max_lead": (0.0, None),
+    "cursor_rate_hz": (1, None),
+    "roi_margin": (0.0, None),
+    "roi_max_input": (32, None),
+    "roi_rescan_s": (0.0, None),
+    "flow_max_interval": (1, None),
+    "flow_min_track": (0.0, 1.0),
+    "flow_slow_px_s": (0, None),
+    "flow_fast_px_s": (0, None),
+    "preview_fps": (0, None),
+    "idle_after_s": (0.0, None),
+    "idle_fps": (0, None),
+    "idle_wake_grace_s": (0.0, None),
+    "motion_threshold": (0, 255),
+    "motion_min_fraction": (0.0, 1.0),
+    "latency_target_ms": (1, None),
+    "quality_level": (0, 4),        # governor.QualityGovernor.LEVELS
+    "status_interval": (0.0, None),
+    "voice_sample_rate": (8000, 48000),
+    "voice_vad_ratio": (1.0, None),
+    "voice_pre_roll_ms": (0, None),
+    "voice_hangover_ms": (0, None),
+    "voice_max_phrase_s": (0.5, None),
+    "bus_queue": (1, None),
+    "bus_batch_frames": (1, None),
+    "inference_slots": (3, None),
+    "inference_max_restarts": (0, None),
+}
+
+CHOICES = {
+    "volume_backend": ("auto", "pycaw", "mixer", "stub"),
+    "capture_source": ("camera", "file", "synthetic"),
+    "capture_fourcc": ("auto", "YUYV", "MJPG"),
+    "cursor_filter": ("exp", "one_euro", "kalman"),
+    "cursor_output": ("extrapolate", "interpolate"),
+    "input_backend": ("pyautogui", "raw", "record"),
+    "voice_recognizer": ("vosk", "google"),
+    "record_mode": ("landmarks", "frames", "both"),
+}
+
+_NUMBER = (int, float)
+TYPES = {
+    "smoothing_alpha": _NUMBER,
+    "volume_min_dist": _NUMBER,
+    "volume_max_dist": _NUMBER,
+    "capture_path": str,
+    "voice_model_path": str,
+    "voice_wav_path": str,
+    "record_path": str,
+    "bus_address": str,
+    "volume_rate_hz": _NUMBER,
+    "cursor_rate_hz": _NUMBER,
+    "flow_slow_px_s": _NUMBER,
+    "flow_fast_px_s": _NUMBER,
+    "preview_fps": _NUMBER,
+    "idle_fps": _NUMBER,
+    "latency_target_ms": _NUMBER,
+    "voice_hangover_ms": _NUMBER,
+    "voice_pre_roll_ms": _NUMBER,
+    "cursor_monitor": (str, int),
+}
+
+# Only read when the app starts (camera, model process, backends); a
+# changed value in a running app waits for the next start
+RESTART_KEYS = frozenset(k for k in DEFAULTS if k.startswith(("capture_", "inference_"))) | {
+    "cursor_rate_hz", "cursor_output", "input_backend", "volume_backend", "record_path", "record_mode",
+    "bus_enabled", "bus_address",
+}
+
+
+def _problem(key, value):
+    # What is wrong with value for key, or None if it is acceptable
+    default = DEFAULTS[key]
+    if value is None:
+        return None if default is None else "must not be null"
+    if key in TYPES:
+        types = TYPES[key]
+    elif isinstance(default, float):
+        types = _NUMBER
+    else:
+        types = type(default)
+    if isinstance(value, bool) != isinstance(default, bool) or not isinstance(value, types):
+        names = types.__name__ if isinstance(types, type) else "number"
+        return f"expected {names}, got {value!r}"
+    if key == "cursor_monitor" and value != "all" and not (isinstance(value, int) and value >= 0):
+        return f"expected \"all\" or a monitor index, got {value!r}"
+    if key in CHOICES and value not in CHOICES[key]:
+        return f"expected one of {', '.join(CHOICES[key])}, got {value!r}"
+    lo, hi = RANGES.get(key, (None, None))
+    if (lo is not None and value < lo) or (hi is not None and value > hi):
+        return f"expected {lo if lo is not None else ''}..{hi if hi is not None else ''}, got {value!r}"
+    return None
+
+
+def validate(data):
+    # Returns (settings, problems). A value of the wrong type or outside
+    # its RANGES / CHOICES falls back to the default; unknown keys pass
+    # through.
+    settings = dict(DEFAULTS)
+    problems = []
+    for key, value in data.items():
+        problem = _problem(key, value) if key in DEFAULTS else None
+        if problem is None:
+            settings[key] = value
+        else:
+            problems.append(f"{key}: {problem}")
+    # Combinations no single value shows
+    if settings["capture_source"] == "file" and not settings["capture_path"]:
+        problems.append("capture_source: \"file\" needs capture_path, using the camera")
+        settings["capture_source"] = DEFAULTS["capture_source"]
+    return settings, problems
+
+
+def _read(path):
+    # Missing file or bad JSON just means defaults
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        return dict(DEFAULTS), [f"{os.path.basename(path)}: {e}"]
+    if not isinstance(data, dict):
+        return dict(DEFAULTS), [f"{os.path.basename(path)}: not a JSON object"]
+    return validate(data)
+
+
+def load_settings(path=SETTINGS_PATH):
+    return _read(path)[0]
+
+
+def _mtime(path):
+    try:
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+    except OSError:
+        return None
+
+
+class SettingsStore(threading.Thread):
+    # The running app's view of avm_settings.json.
+    #   - `current` is an immutable snapshot. A change publishes a new one
+    #     by swapping the reference, so the vision loop reads store.current
+    #     once per frame without a lock and applies it if it changed
+    #   - this thread polls the file's mtime and publishes valid edits (a
+    #     bad value falls back to its default and lands in `problems`)
+    #   - set() (the sliders) publishes immediately and writes the file back
+    #     debounce_s after the last change, atomically via a temp file and
+    #     os.replace, so an editor or a crash never sees half a file
+    #   - overrides (command line flags) sit on top of every snapshot and
+    #     are never written to the file
+
+    def __init__(self, path=SETTINGS_PATH, poll_s=0.5, debounce_s=0.5, overrides=None):
+        super().__init__(daemon=True)
+        self.path = path
+        self.poll_s = poll_s
+        self.debounce_s = debounce_s
+        self.overrides = dict(overrides or {})
+        self.running = False
+
+        self._file, self.problems = _read(path)
+        self.current = MappingProxyType(self._merge(self._file))
+        self._seen = _mtime(path)
+        self._write_at = None
+        self._cond = threading.Condition()
+
+        # Counters
+        self.reloads = 0
+        self.writes = 0
+
+    def start(self):
+        self.running = True
+        super().start()
+
+    def stop(self):
+        # Pending slider changes are written before the thread exits
+        with self._cond:
+            self.running = False
+            self._cond.notify()
+        if self.is_alive():
+            self.join()
+
+    def set(self, **changes):
+        # Any thread. Publishes at once; the file follows after debounce_s.
+        with self._cond:
+            settings, problems = validate({**self.current, **changes})
+            self.current = MappingProxyType(settings)
+            self.problems = problems
+            self._write_at = time.monotonic() + self.debounce_s
+            self._cond.notify()
+
+    def _merge(self, settings):
+        if not self.overrides:
+            return settings
+        merged, problems = validate({**settings, **self.overrides})
+        self.problems += problems
+        return merged
+
+    def _reload(self):
+        settings, problems = _read(self.path)
+        with self._cond:
+            self._file = settings
+            self.problems = problems
+            self.current = MappingProxyType(self._merge(settings))
+            self.reloads += 1
+
+    def _write(self):
+        data = dict(self.current)
+        data.update((k, self._file[k]) for k in self.overrides if k in self._file)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp, self.path)
+        self._seen = _mtime(self.path)
+        self.writes += 1
+
+    def run(self):
+        while True:
+            with self._cond:
+                timeout = self.poll_s
+                if self._write_at is not None:
+                    timeout = min(timeout, max(0.0, self._write_at - time.monotonic()))
+                self._cond.wait_for(lambda: not self.running, timeout)
+                write = self._write_at is not None and (not self.running or time.monotonic() >= self._write_at)
+                if write:
+                    self._write_at = None
+                running = self.running
+            try:
+                if write:
+                    self._write()
+                elif _mtime(self.path) != self._seen:
+                    self._seen = _mtime(self.path)
+                    self._reload()
+            except OSError as e:
+                self.problems = [str(e)]
+            if not running:
+                break
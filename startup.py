@@ -0,0 +1,66 @@
+# startup.py
+import sys
+import threading
+from contextlib import contextmanager
+from metrics import now
+
+
+class StartupTimer:
+    # Per-phase startup breakdown. Phases may overlap (camera and model
+    # warm up in parallel), so each keeps its own start offset from t0;
+    # milestones ("window_shown", "first_frame") are zero-length phases.
+    # Written from the GUI thread and the warm-up threads, hence the lock.
+
+    def __init__(self, t0=None):
+        self.t0 = now() if t0 is None else t0
+        self.phases = []    # (name, start_s, duration_s), start relative to t0
+        self._open = {}
+        self._lock = threading.Lock()
+
+    def begin(self, name):
+        with self._lock:
+            self._open[name] = now()
+
+    def end(self, name):
+        t = now()
+        with self._lock:
+            start = self._open.pop(name, t)
+            self.phases.append((name, start - self.t0, t - start))
+
+    @contextmanager
+    def phase(self, name):
+        self.begin(name)
+        try:
+            yield
+        finally:
+            self.end(name)
+
+    def mark(self, name, t=None):
+        t = now() if t is None else t
+        with self._lock:
+            self.phases.append((name, t - self.t0, 0.0))
+
+    def elapsed(self, name):
+        # Offset of the end of a phase or milestone, None if not reached
+        with self._lock:
+            for phase, start, duration in self.phases:
+                if phase == name:
+                    return start + duration
+        return None
+
+    def summary(self):
+        # {phase: {"start_ms", "ms"}} for metrics snapshots
+        with self._lock:
+            return {name: {"start_ms": round(start * 1000, 1), "ms": round(duration * 1000, 1)}
+                    for name, start, duration in self.phases}
+
+    def report(self, file=None):
+        # Phases in the order they finished, with when they finished
+        file = file or sys.stderr
+        with self._lock:
+            phases = sorted(self.phases, key=lambda p: p[1] + p[2])
+        print("startup:", file=file)
+        for name, start, duration in phases:
+            took = f"{duration * 1000:7.1f} ms" if duration else "        -"
+            print(f"  {name:<16}{took}   done at {(start + duration) * 1000:7.1f} ms", file=file)
+
@@ -0,0 +1,100 @@
+# status.py
+import threading
+from collections import deque
+from enum import Enum
+from metrics import now
+
+
+class UiEvent(Enum):
+    # Window actions requested by gestures or voice (these used to travel
+    # as the "TOGGLE_UI" / "TOGGLE_SLEEP" status strings)
+    TOGGLE_UI = "toggle_ui"
+    TOGGLE_SLEEP = "toggle_sleep"
+
+
+# Status colours and the pre-built overlay pill style each one selects
+# (ui.py turns these into #OverlayPill[tone="..."] rules once)
+TONES = {
+    "#888888": "idle",
+    "#aaaaaa": "muted",
+    "#ffffff": "info",
+    "#00d4ff": "move",
+    "#00ff00": "ok",
+    "#ffff00": "ready",
+    "#ffaa00": "drag",
+    "#ff00ff": "nav",
+    "#00ffcc": "volume",
+    "#ff0000": "alert",
+}
+
+
+def tone(color):
+    return TONES.get(color.lower(), "info")
+
+
+class StatusModel:
+    # Sits between everything that reports status and the UI signal:
+    #   - an update equal to what is on screen is dropped
+    #   - a shown status is held for at least min_interval; updates arriving
+    #     meanwhile are merged (latest wins) and shown when the hold ends,
+    #     unless the screen already matches
+    #   - event updates (one-off messages: "CLICK", "Voice OFF") are queued
+    #     instead, each shown for its own min_interval before the merged
+    #     state comes back
+    #   - whatever is waiting only goes out on the next update() or flush(),
+    #     so the owner calls flush() from a timer (the UI) or by due() (the
+    #     headless loop); a stalled camera does not leave it stuck
+    # Called from the vision loop every frame and from the GUI thread for
+    # one-off messages, hence the lock.
+
+    def __init__(self, emit, min_interval=0.1, clock=now):
+        self.emit = emit
+        self.min_interval = min_interval
+        self.clock = clock
+        self.shown = None
+        self.pending = None
+        self.events = deque(maxlen=4)
+        self.last_emit = -1e9
+        self._lock = threading.Lock()
+
+        # Counters
+        self.emitted = 0
+        self.suppressed = 0
+
+    def update(self, text, color, event=False):
+        with self._lock:
+            status = (text, color)
+            if event:
+                self.events.append(status)
+            elif status == self.shown and self.pending is None and not self.events:
+                self.suppressed += 1
+                return
+            else:
+                self.pending = status
+            self._flush(self.clock())
+
+    def flush(self):
+        with self._lock:
+            self._flush(self.clock())
+
+    def due(self):
+        # Seconds until a waiting status can be shown, None when none waits
+        with self._lock:
+            if self.pending is None and not self.events:
+                return None
+            return max(0.0, self.last_emit + self.min_interval - self.clock())
+
+    def _flush(self, t):
+        if (self.pending is None and not self.events) or t - self.last_emit < self.min_interval:
+            return
+        if self.events:
+            status = self.events.popleft()
+        else:
+            status, self.pending = self.pending, None
+        if status == self.shown:
+            self.suppressed += 1
+            return
+        self.shown = status
+        self.last_emit = t
+        self.emitted += 1
+        self.emit(*status)
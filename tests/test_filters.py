@@ -0,0 +1,32 @@
+# tests/test_filters.py
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from filters import CursorFilter
+from settings import DEFAULTS
+
+
+def _exp_filter(**changes):
+    settings = dict(DEFAULTS, cursor_filter="exp", cursor_predict=False, **changes)
+    return CursorFilter.from_settings(settings, clock=lambda: 0.0)
+
+
+def _step(f):
+    # One sample at 0, then a jump to 100: the output moves alpha * 100
+    f.update(0.0, 0.0, 0.0)
+    return f.update(100.0, 100.0, 0.033)[0]
+
+
+def test_smoothing_alpha_sets_exp_filter():
+    assert _step(_exp_filter(smoothing_alpha=0.8)) == 80.0
+    assert _step(_exp_filter(smoothing_alpha=0.1)) == 10.0
+
+
+def test_smoothing_alpha_wins_over_slider():
+    assert _step(_exp_filter(smoothing_alpha=0.8, smoothing_level=20)) == 80.0
+
+
+def test_slider_sets_alpha_when_smoothing_alpha_is_null():
+    assert _step(_exp_filter(smoothing_alpha=None, smoothing_level=4)) == 25.0
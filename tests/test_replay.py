@@ -0,0 +1,39 @@
+# tests/test_replay.py
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from recording import read_recording
+from replay import Recording, ReplayDriver, write_synthetic
+from settings import DEFAULTS
+
+
+def test_settings_travel_with_the_recording(tmp_path):
+    path = str(tmp_path / "session.avmrec")
+    write_synthetic(path)
+    w, h, settings, records = read_recording(path)
+    assert settings == DEFAULTS and len(records) == 379
+
+    driver = ReplayDriver()
+    driver.run(Recording(path))
+    assert driver.settings["pinch_thresh"] == DEFAULTS["pinch_thresh"]
+
+
+def test_recorded_settings_win_over_defaults(tmp_path):
+    path = str(tmp_path / "session.avmrec")
+    write_synthetic(path)
+    recording = Recording(path)
+    recording.settings = dict(recording.settings, sensitivity=2.5)
+    driver = ReplayDriver({"pinch_thresh": 0.4})
+    driver.run(recording)
+    assert driver.settings["sensitivity"] == 2.5 and driver.settings["pinch_thresh"] == 0.4
+
+
+def test_old_recordings_replay_with_defaults():
+    recording = Recording(os.path.join(ROOT, "recordings", "baseline_gestures.avmrec"))
+    assert recording.settings == {}
+    result = ReplayDriver().run(recording)
+    assert result.summary() == {"move": 235, "double_click": 1, "click": 1, "mouse_down": 1, "mouse_up": 1,
+                                "hotkey": 2, "right_click": 2}
@@ -0,0 +1,57 @@
+# tests/test_settings.py
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from governor import QualityGovernor
+from settings import DEFAULTS, RANGES, SETTINGS_PATH, validate
+
+
+def test_shipped_settings_are_valid():
+    with open(SETTINGS_PATH) as f:
+        assert validate(json.load(f))[1] == []
+    assert validate(DEFAULTS)[1] == []
+
+
+def test_out_of_range_and_unknown_choice_fall_back():
+    settings, problems = validate({"quality_level": 7, "cursor_filter": "foo", "record_mode": "x"})
+    assert settings["quality_level"] == DEFAULTS["quality_level"]
+    assert settings["cursor_filter"] == DEFAULTS["cursor_filter"]
+    assert settings["record_mode"] == DEFAULTS["record_mode"]
+    assert len(problems) == 3
+
+
+def test_types():
+    settings, problems = validate({"volume_min_dist": "near", "bus_address": 5, "capture_fps": 29.97,
+                                   "capture_width": None, "latency_target_ms": 22.5, "sensitivity": 2})
+    assert settings["volume_min_dist"] is None and settings["bus_address"] is None
+    assert settings["capture_fps"] == 30 and settings["capture_width"] == 640
+    assert settings["latency_target_ms"] == 22.5 and settings["sensitivity"] == 2
+    assert len(problems) == 4
+
+
+def test_quality_level_range_matches_governor():
+    assert RANGES["quality_level"] == (0, len(QualityGovernor.LEVELS) - 1)
+
+
+def test_cursor_monitor():
+    from cursor import ScreenMapper
+    settings, problems = validate({"cursor_monitor": "left"})
+    assert settings["cursor_monitor"] == "all" and len(problems) == 1
+    for bad in (-1, "1", 1.0, True):
+        assert validate({"cursor_monitor": bad})[1]
+    assert validate({"cursor_monitor": 1})[0]["cursor_monitor"] == 1
+
+    mapper = ScreenMapper(1, monitors=[(0, 0, 1920, 1080), (1920, 0, 1280, 1024)])
+    assert mapper.rect == (1920, 0, 1280, 1024)
+    mapper.select("left")
+    assert mapper.rect == (0, 0, 3200, 1080)
+
+
+def test_file_source_needs_a_path():
+    settings, problems = validate({"capture_source": "file"})
+    assert settings["capture_source"] == "camera" and len(problems) == 1
+    settings, problems = validate({"capture_source": "file", "capture_path": "clip.mp4"})
+    assert settings["capture_source"] == "file" and problems == []
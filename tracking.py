@@ -0,0 +1,150 @@
+# tracking.py
+import cv2
+import numpy as np
+
+
+class LandmarkPropagator:
+    # Keyframe mode: MediaPipe runs on keyframes only, and in between the 21
+    # landmarks per hand are carried forward with pyramidal Lucas-Kanade on
+    # a grayscale crop around the hands. z is carried unchanged.
+    #
+    # The keyframe interval adapts to hand speed: slow hands go up to
+    # max_interval frames between inferences, fast hands get one every
+    # frame. The share of points LK must track follows the same ramp, so
+    # tracking is trusted less when the hand moves fast. A keyframe is
+    # forced whenever the caller asks for precision (pinch about to
+    # release, click thresholds nearby), when tracking degrades or when the
+    # points drift out of the crop.
+
+    LK_PARAMS = dict(winSize=(15, 15), maxLevel=2,
+                     criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03))
+
+    def __init__(self, enabled=True, max_interval=4, min_track=0.8, slow_px_s=150.0, fast_px_s=900.0):
+        self.enabled = enabled
+        self.max_interval = max_interval
+        self.min_track = min_track
+        self.slow_px_s = slow_px_s
+        self.fast_px_s = fast_px_s
+
+        self.region = None          # (x0, y0, x1, y1) of the tracked gray crop
+        self.tracking = False       # landmarks from the last keyframe can be propagated
+        self.prev_gray = None
+        self._backing = [None, None]    # frame-sized byte buffers the gray crops live in
+        self._front = 0
+        self.allocations = 0
+        self.since_key = 0
+        self.speed = 0.0
+        self.last_t = None
+        self.last_center = None
+
+        # Counters
+        self.keyframes = 0
+        self.propagated = 0
+        self.track_failures = 0
+
+    @classmethod
+    def from_settings(cls, settings):
+        propagator = cls()
+        propagator.configure(settings)
+        return propagator
+
+    def configure(self, settings):
+        # Also applied live; the next should_infer() uses the new limits
+        self.enabled = settings["flow_enabled"]
+        self.max_interval = settings["flow_max_interval"]
+        self.min_track = settings["flow_min_track"]
+        self.slow_px_s = settings["flow_slow_px_s"]
+        self.fast_px_s = settings["flow_fast_px_s"]
+
+    def _ramp(self):
+        # 0 for slow hands, 1 for fast ones
+        span = max(self.fast_px_s - self.slow_px_s, 1.0)
+        return min(max((self.speed - self.slow_px_s) / span, 0.0), 1.0)
+
+    def interval(self):
+        return max(1, round(self.max_interval - (self.max_interval - 1) * self._ramp()))
+
+    def track_threshold(self):
+        return self.min_track + (1.0 - self.min_track) * 0.5 * self._ramp()
+
+    def should_infer(self, precision=False):
+        return (not self.enabled or precision or not self.tracking or
+                self.since_key + 1 >= self.interval())
+
+    def _update_speed(self, hands, t):
+        if hands.count == 0:
+            self.last_center = None
+            return
+        c = hands.points[:hands.count, :, :2].reshape(-1, 2).mean(axis=0)
+        if self.last_center is not None and self.last_t is not None and t > self.last_t:
+            v = float(np.hypot(*(c - self.last_center))) / (t - self.last_t)
+            self.speed += (v - self.speed) * 0.5
+        self.last_center = c
+        self.last_t = t
+
+    def keyframe(self, rgb_frame, hands, t):
+        # Fresh MediaPipe landmarks: remember the crop they will be tracked in
+        self.keyframes += 1
+        self.since_key = 0
+        self._update_speed(hands, t)
+        if not self.enabled or hands.count == 0:
+            self.tracking = False
+            return
+
+        h, w = rgb_frame.shape[:2]
+        xy = hands.points[:hands.count, :, :2].reshape(-1, 2)
+        bx0, by0 = xy.min(axis=0).tolist()
+        bx1, by1 = xy.max(axis=0).tolist()
+        pad = 0.5 * max(bx1 - bx0, by1 - by0) + 20
+        x0, y0 = int(max(bx0 - pad, 0)), int(max(by0 - pad, 0))
+        x1, y1 = int(min(bx1 + pad, w)), int(min(by1 + pad, h))
+        if x1 - x0 < 16 or y1 - y0 < 16:
+            self.tracking = False
+            return
+        self.region = (x0, y0, x1, y1)
+        self.prev_gray = self._gray(rgb_frame, self._front)
+        self.tracking = True
+
+    def _gray(self, rgb_frame, i):
+        # Gray crop of the tracked region written into backing buffer i. The
+        # crop size changes with every keyframe, so it is a contiguous view
+        # over a buffer allocated once per frame size.
+        x0, y0, x1, y1 = self.region
+        size = rgb_frame.shape[0] * rgb_frame.shape[1]
+        if self._backing[i] is None or self._backing[i].size != size:
+            self._backing[i] = np.empty(size, np.uint8)
+            self.allocations += 1
+        buf = self._backing[i][:(y1 - y0) * (x1 - x0)].reshape(y1 - y0, x1 - x0)
+        return cv2.cvtColor(rgb_frame[y0:y1, x0:x1], cv2.COLOR_RGB2GRAY, dst=buf)
+
+    def propagate(self, rgb_frame, hands, t):
+        # Moves hands.points forward in place. Returns False when tracking is
+        # not good enough; the caller should run inference on this frame.
+        x0, y0, x1, y1 = self.region
+        gray = self._gray(rgb_frame, 1 - self._front)
+        n = hands.count
+        prev = hands.points[:n, :, :2].reshape(-1, 1, 2) - np.float32((x0, y0))
+        nxt, status, err = cv2.calcOpticalFlowPyrLK(self.prev_gray, gray, prev, None, **self.LK_PARAMS)
+
+        if status is None or status.mean() < self.track_threshold():
+            self.track_failures += 1
+            return False
+        # Points leaving the crop cannot be tracked next time either
+        if (nxt[..., 0].min() < 2 or nxt[..., 1].min() < 2 or
+                nxt[..., 0].max() > (x1 - x0) - 2 or nxt[..., 1].max() > (y1 - y0) - 2):
+            return False
+
+        # Lost individual points follow the median motion of the rest
+        ok = status.ravel().astype(bool)
+        moved = nxt.reshape(-1, 2)
+        if not ok.all():
+            shift = np.median(moved[ok] - prev.reshape(-1, 2)[ok], axis=0)
+            moved[~ok] = prev.reshape(-1, 2)[~ok] + shift
+
+        hands.points[:n, :, :2] = (moved + np.float32((x0, y0))).reshape(n, 21, 2)
+        self.prev_gray = gray
+        self._front = 1 - self._front
+        self.since_key += 1
+        self.propagated += 1
+        self._update_speed(hands, t)
+        return True
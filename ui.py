@@ -1,12 +1,15 @@
 # ui.py
 import os
+import time
 from PySide6 import QtCore, QtGui, QtWidgets
-from PySide6.QtCore import Qt, Slot, QPropertyAnimation, QEasingCurve, QRect, QSize
+from PySide6.QtCore import Qt, Slot, QPropertyAnimation, QEasingCurve, QRect, QSize, QEvent
 from PySide6.QtGui import QImage, QPixmap, QIcon
 from PySide6.QtWidgets import (
     QWidget, QMainWindow, QLabel, QVBoxLayout, QHBoxLayout,
     QToolButton, QFrame, QSlider, QPushButton, QCheckBox, QGraphicsDropShadowEffect, QSizePolicy
 )
+from preview import PreviewLabel
+from status import UiEvent, TONES, tone
 
 
 class MainWindow(QMainWindow):
@@ -29,9 +32,12 @@ class MainWindow(QMainWindow):
         self.cam_layout = QVBoxLayout(self.camera_frame)
         self.cam_layout.setContentsMargins(0, 0, 0, 0)
 
-        self.video_label = QLabel()
+        # Frames arrive already scaled to this label; landmarks are painted
+        # on top (see preview.py)
+        self.video_label = PreviewLabel()
         self.video_label.setAlignment(Qt.AlignCenter)
-        self.video_label.setScaledContents(True)
+        self.video_label.setSizePolicy(QSizePolicy.Ignored, QSizePolicy.Ignored)
+        self.video_label.installEventFilter(self)
         self.cam_layout.addWidget(self.video_label)
         self.main_layout.addWidget(self.camera_frame)
 
@@ -175,9 +181,34 @@ class MainWindow(QMainWindow):
         self.resp_slider.setValue(5)
         self.controls_layout.addWidget(self.resp_slider)
 
+        # E. LIVE STATS (optional overlay)
+        self.stats_frame = QFrame()
+        self.stats_frame.setVisible(False)
+        stats_layout = QVBoxLayout(self.stats_frame)
+        stats_layout.setContentsMargins(0, 0, 0, 0)
+        self.stats_label = QLabel("")
+        self.stats_label.setObjectName("StatsText")
+        stats_layout.addWidget(self.stats_label)
+        self.btn_export = QPushButton("Export Stats")
+        self.btn_export.setObjectName("pillBtn")
+        self.btn_export.setFixedHeight(30)
+        self.btn_export.clicked.connect(self.export_stats)
+        stats_layout.addWidget(self.btn_export)
+        self.controls_layout.addWidget(self.stats_frame)
+
+        self.btn_stats = QPushButton("Stats")
+        self.btn_stats.setObjectName("pillBtn")
+        self.btn_stats.setFixedHeight(30)
+        self.btn_stats.clicked.connect(self.toggle_stats)
+        self.controls_layout.addWidget(self.btn_stats)
+
+        self.stats_timer = QtCore.QTimer(self)
+        self.stats_timer.setInterval(500)
+        self.stats_timer.timeout.connect(self.refresh_stats)
+
         self.controls_layout.addStretch()
 
-        # E. COMMANDS
+        # F. COMMANDS
         self.cmd_frame = QFrame()
         self.cmd_frame.setVisible(False)
         cmd_layout = QVBoxLayout(self.cmd_frame)
@@ -233,12 +264,55 @@ class MainWindow(QMainWindow):
     def sidebar_width(self):
         return 280
 
+    def eventFilter(self, obj, event):
+        if obj is self.video_label and event.type() == QEvent.Resize:
+            self.update_preview_target()
+        return super().eventFilter(obj, event)
+
+    def changeEvent(self, event):
+        if event.type() == QEvent.WindowStateChange:
+            self.update_preview_visibility()
+        super().changeEvent(event)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.update_preview_visibility()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.update_preview_visibility()
+
+    def update_preview_target(self):
+        if self.worker:
+            size = self.video_label.size()
+            self.worker.preview.set_target(size.width(), size.height(), self.video_label.devicePixelRatioF())
+
+    def update_preview_visibility(self):
+        if self.worker:
+            self.worker.preview.set_visible(self.isVisible() and not self.isMinimized() and
+                                            self.video_label.isVisible())
+
     def set_worker(self, worker):
         self.worker = worker
+        # Preview never runs faster than the display refreshes
+        worker.preview.display_hz = QtGui.QGuiApplication.primaryScreen().refreshRate()
+        worker.preview.set_max_fps(worker.settings["preview_fps"])
+        self.update_preview_target()
+        self.update_preview_visibility()
         worker.frame_ready.connect(self.update_frame)
         worker.status_update.connect(self.update_status)
-        self.resp_slider.valueChanged.connect(lambda v: setattr(worker, 'smoothening', v))
-        self.sens_slider.valueChanged.connect(lambda v: setattr(worker, 'sensitivity', v / 10))
+        worker.ui_event.connect(self.handle_ui_event)
+        # Statuses held back by the rate limit go out from here, so they
+        # show even while no frames arrive (standby, camera dropped)
+        self.status_timer = QtCore.QTimer(self)
+        self.status_timer.timeout.connect(worker.status.flush)
+        self.status_timer.start(50)
+        # Sliders are settings: published to the vision loop at once, saved
+        # to avm_settings.json once they stop moving
+        self.sens_slider.setValue(round(worker.settings["sensitivity"] * 10))
+        self.resp_slider.setValue(worker.settings["smoothing_level"])
+        self.resp_slider.valueChanged.connect(lambda v: worker.store.set(smoothing_level=v))
+        self.sens_slider.valueChanged.connect(lambda v: worker.store.set(sensitivity=v / 10))
 
     def toggle_voice_ui(self, checked):
         if self.worker:
@@ -283,6 +357,27 @@ class MainWindow(QMainWindow):
         else:
             self.cmd_frame.show()
 
+    def toggle_stats(self):
+        if self.stats_frame.isVisible():
+            self.stats_frame.hide()
+            self.stats_timer.stop()
+        else:
+            self.refresh_stats()
+            self.stats_frame.show()
+            self.stats_timer.start()
+
+    def refresh_stats(self):
+        if self.worker:
+            self.stats_label.setText(self.worker.metrics.format_overlay())
+
+    def export_stats(self):
+        if not self.worker:
+            return
+        base = time.strftime("avm_stats_%Y%m%d_%H%M%S")
+        self.worker.metrics.export_json(base + ".json")
+        self.worker.metrics.export_csv(base + ".csv")
+        self.status_box.setText("Stats Exported")
+
     def toggle_sidebar(self):
         h = self.height()
         if self.is_open:
@@ -303,14 +398,20 @@ class MainWindow(QMainWindow):
         self.anim.start()
         self.is_open = not self.is_open
 
-    @Slot(QImage)
-    def update_frame(self, qimg):
+    @Slot(QImage, int, object)
+    def update_frame(self, qimg, index, overlay):
+        t0 = time.perf_counter()
+        # fromImage copies, so the worker may reuse the buffer right after
         pix = QPixmap.fromImage(qimg)
-        self.video_label.setPixmap(pix.scaled(self.video_label.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation))
+        if self.worker:
+            self.worker.preview.release(index)
+        self.video_label.set_frame(pix, overlay)
+        if self.worker:
+            self.worker.metrics.record("render", time.perf_counter() - t0)
 
-    @Slot(str, str)
-    def update_status(self, text, color):
-        if text == "TOGGLE_UI":
+    @Slot(object)
+    def handle_ui_event(self, event):
+        if event == UiEvent.TOGGLE_UI:
             if self.is_hidden_mode:
                 self.sidebar.show()
                 self.overlay_pill.show()
@@ -318,29 +419,31 @@ class MainWindow(QMainWindow):
                 self.sidebar.hide()
                 self.overlay_pill.hide()
             self.is_hidden_mode = not self.is_hidden_mode
-            return
 
-        if text == "TOGGLE_SLEEP":
+        elif event == UiEvent.TOGGLE_SLEEP:
             if self.isHidden():
                 self.showNormal()
             else:
                 self.showMinimized()
-            return
 
+    @Slot(str, str)
+    def update_status(self, text, color):
         self.overlay_pill.setText(text)
-        self.overlay_pill.setStyleSheet(f"""
-            background-color: rgba(0, 0, 0, 0.7);
-            color: {color};
-            border-radius: 20px;
-            font-weight: bold;
-            font-size: 14px;
-        """)
+        # Switch between the pre-built #OverlayPill[tone=...] rules; a
+        # re-polish is far cheaper than setStyleSheet's full re-parse
+        name = tone(color)
+        if self.overlay_pill.property("tone") != name:
+            self.overlay_pill.setProperty("tone", name)
+            self.overlay_pill.style().unpolish(self.overlay_pill)
+            self.overlay_pill.style().polish(self.overlay_pill)
 
         if not self.btn_mic.isChecked():
             self.status_box.setText(text)
 
     def qss(self):
-        return """
+        tones = "".join(f'#OverlayPill[tone="{name}"] {{ color: {color}; }}\n'
+                        for color, name in TONES.items())
+        return tones + """
         QMainWindow { background-color: #121212; }
         QLabel { color: white; font-family: 'Segoe UI', sans-serif; }
         #Sidebar { background-color: #1e1e1e; border-right: 1px solid #333; }
@@ -354,5 +457,6 @@ class MainWindow(QMainWindow):
         #pillBtnOutline { background-color: transparent; border: 1px solid #444; border-radius: 20px; font-size: 14px; color: #ddd; }
         QSlider::groove:horizontal { height: 4px; background: #444; border-radius: 2px; }
         QSlider::handle:horizontal { background: #00d4ff; width: 16px; height: 16px; margin: -6px 0; border-radius: 8px; }
-        #OverlayPill { background-color: rgba(0,0,0,0.6); color: white; border-radius: 20px; }
+        #OverlayPill { background-color: rgba(0,0,0,0.7); color: white; border-radius: 20px; font-weight: bold; font-size: 14px; }
+        #StatsText { background: #252525; color: #aaa; padding: 8px; border-radius: 10px; font-family: Consolas, monospace; font-size: 11px; }
         """
\ No newline at end of file
@@ -0,0 +1,265 @@
+# voice.py
+import argparse
+import json
+import os
+import re
+import sys
+from PySide6.QtCore import QThread, Signal
+from audio import make_audio_source, PhraseSegmenter
+from status import UiEvent
+
+
+# --- COMMANDS ---
+
+class VoiceCommand:
+    # A spoken command. Any of its phrases (lowercase, whole words) in the
+    # recognized text runs action(host, text); status is shown first.
+
+    def __init__(self, name, phrases, action, status=None):
+        self.name = name
+        self.phrases = tuple(p.lower() for p in phrases)
+        self.action = action
+        self.status = status
+
+
+class CommandRegistry:
+    # All phrases go into one alternation, compiled once per change of the
+    # command set; longer phrases are tried first so "close window" wins
+    # over "close" at the same position. The phrase list doubles as the
+    # grammar for constrained recognizers.
+
+    def __init__(self, commands=()):
+        self.commands = {}
+        self._pattern = None
+        self._by_phrase = {}
+        for command in commands:
+            self.register(command)
+
+    def register(self, command):
+        self.commands[command.name] = command
+        self._pattern = None
+
+    def vocabulary(self):
+        return sorted({p for c in self.commands.values() for p in c.phrases})
+
+    def match(self, text):
+        if self._pattern is None:
+            self._compile()
+        m = self._pattern.search(text.lower())
+        return self._by_phrase[m.group(0)] if m else None
+
+    def _compile(self):
+        self._by_phrase = {p: c for c in self.commands.values() for p in c.phrases}
+        phrases = sorted(self._by_phrase, key=len, reverse=True)
+        self._pattern = re.compile(r"\b(?:%s)\b" % "|".join(re.escape(p) for p in phrases))
+
+
+def _open_chrome(host, text):
+    host.input.hotkey('win', 'r')
+    host.input.wait(0.5)
+    host.input.write('chrome')
+    host.input.press('enter')
+
+
+def _close_window(host, text):
+    host.input.hotkey('alt', 'f4')
+
+
+def _toggle_ui(host, text):
+    host.ui_event.emit(UiEvent.TOGGLE_UI)
+
+
+DEFAULT_COMMANDS = [
+    VoiceCommand("chrome", ("chrome", "open chrome"), _open_chrome, status=("Opening Chrome...", "#00ff00")),
+    VoiceCommand("close", ("close", "close window"), _close_window, status=("Closing Window...", "#ff0000")),
+    VoiceCommand("show", ("show", "show interface"), _toggle_ui),
+]
+
+
+# --- RECOGNIZERS ---
+# recognize(pcm) takes one finished phrase (int16 mono at sample_rate, from
+# audio.PhraseSegmenter) and returns its text or None. Created and used on
+# the voice thread.
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_URL = "https://alphacephei.com/vosk/models/vosk-model-small-en-us-0.15.zip"
+
+
+def model_dir(path):
+    # voice_model_path, relative paths taken from the app folder
+    return path if os.path.isabs(path) else os.path.join(APP_DIR, path)
+
+
+class VoskRecognizer:
+    # Offline Kaldi decoder constrained to the command phrases (anything
+    # else comes out as [unk]). No network round-trip; a short phrase
+    # decodes in milliseconds. The model must be on disk already.
+    name = "vosk"
+
+    def __init__(self, vocabulary, sample_rate=16000, model_path=None):
+        try:
+            from vosk import Model, KaldiRecognizer, SetLogLevel
+        except ImportError:
+            raise RuntimeError("vosk not installed (pip install vosk)")
+        path = model_dir(model_path) if model_path else None
+        if path is None or not os.path.isdir(path):
+            raise RuntimeError("no vosk model (python voice.py --fetch-model)")
+        SetLogLevel(-1)
+        model = Model(path)
+        self.sample_rate = sample_rate
+        self.rec = KaldiRecognizer(model, sample_rate, json.dumps(list(vocabulary) + ["[unk]"]))
+
+    def recognize(self, pcm):
+        self.rec.AcceptWaveform(pcm.tobytes())
+        text = json.loads(self.rec.FinalResult())["text"].replace("[unk]", "").strip()
+        return text or None
+
+
+class GoogleRecognizer:
+    # Google's web API through speech_recognition. Needs the network and
+    # takes a round-trip per phrase; vocabulary is ignored.
+    name = "google"
+
+    def __init__(self, vocabulary=(), sample_rate=16000, model_path=None):
+        try:
+            import speech_recognition as sr
+        except ImportError:
+            raise RuntimeError("SpeechRecognition not installed")
+        self.sr = sr
+        self.sample_rate = sample_rate
+        self.rec = sr.Recognizer()
+
+    def recognize(self, pcm):
+        sr = self.sr
+        try:
+            return self.rec.recognize_google(sr.AudioData(pcm.tobytes(), self.sample_rate, 2))
+        except sr.UnknownValueError:
+            return None
+
+
+RECOGNIZERS = {r.name: r for r in (VoskRecognizer, GoogleRecognizer)}
+
+
+def make_recognizer(name="vosk", vocabulary=(), sample_rate=16000, model_path=None):
+    # RuntimeError with a short reason when the backend cannot run; there
+    # is deliberately no fallback from the offline recognizer to the web
+    if name not in RECOGNIZERS:
+        raise RuntimeError(f"unknown recognizer {name!r}")
+    return RECOGNIZERS[name](vocabulary, sample_rate, model_path)
+
+
+def fetch_model(dest=None, url=MODEL_URL):
+    # One-time setup step, never run by the app itself: downloads and
+    # unpacks the small en-us vosk model into models/
+    import io
+    import urllib.request
+    import zipfile
+    dest = dest or os.path.join(APP_DIR, "models")
+    os.makedirs(dest, exist_ok=True)
+    with urllib.request.urlopen(url) as response:
+        data = response.read()
+    with zipfile.ZipFile(io.BytesIO(data)) as z:
+        z.extractall(dest)
+        return os.path.join(dest, z.namelist()[0].split("/")[0])
+
+
+# --- WORKER ---
+
+class VoiceWorker(QThread):
+    # Reads the audio source one frame at a time, cuts phrases with the VAD
+    # segmenter and hands each finished phrase to the recognizer. stop()
+    # is cooperative: the loop notices within one frame (plus a phrase
+    # being recognized) and closes the source itself.
+    status_update = Signal(str, str)
+    ui_event = Signal(object)
+
+    def __init__(self, input_dispatcher, settings, commands=DEFAULT_COMMANDS):
+        super().__init__()
+        self.running = False
+        self.input = input_dispatcher
+        self.settings = settings
+        self.commands = CommandRegistry(commands)
+        # The microphone and recognizer are opened the first time voice is
+        # switched on, on this thread, never at startup; the recognizer
+        # (model load) is kept for the next time
+        self.recognizer = None
+        self.segmenter = None
+
+        # Counters
+        self.phrases = 0
+        self.commands_run = 0
+        self.errors = 0
+
+    def run(self):
+        self.running = True
+        source = make_audio_source(self.settings)
+        try:
+            source.open()
+            rate = source.sample_rate
+            if self.recognizer is None or self.recognizer.sample_rate != rate:
+                self.recognizer = self._make_recognizer(rate)
+        except RuntimeError as e:
+            # Missing package or model: say which, rather than a bare failure
+            source.close()
+            self.running = False
+            self.status_update.emit(f"Voice: {e}", "#ff0000")
+            return
+        except Exception:
+            source.close()
+            self.running = False
+            self.status_update.emit("Voice unavailable", "#ff0000")
+            return
+
+        self.segmenter = PhraseSegmenter.from_settings(self.settings, rate, source.frame_samples)
+        try:
+            while self.running:
+                frame = source.read()
+                if frame is None:
+                    break       # end of a WAV source
+                phrase = self.segmenter.feed(frame)
+                if phrase is not None:
+                    self.recognize(phrase)
+        except OSError:
+            self.status_update.emit("Microphone lost", "#ff0000")
+        finally:
+            source.close()
+            self.running = False
+
+    def _make_recognizer(self, rate):
+        return make_recognizer(self.settings["voice_recognizer"], self.commands.vocabulary(),
+                               rate, self.settings["voice_model_path"])
+
+    def recognize(self, pcm):
+        try:
+            text = self.recognizer.recognize(pcm)
+        except Exception:
+            # Network errors (google) or a decoder failure: skip the phrase
+            self.errors += 1
+            return
+        if text:
+            self.handle(text)
+
+    def handle(self, text):
+        self.phrases += 1
+        command = self.commands.match(text)
+        if command is None:
+            return
+        if command.status:
+            self.status_update.emit(*command.status)
+        command.action(self, text)
+        self.commands_run += 1
+
+    def stop(self, timeout_ms=2000):
+        self.running = False
+        self.wait(timeout_ms)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Voice command setup")
+    parser.add_argument("--fetch-model", action="store_true", help=f"download {MODEL_URL} into models/")
+    args = parser.parse_args()
+    if args.fetch_model:
+        print(f"Vosk model in {fetch_model()}")
+    else:
+        parser.print_help()
+    sys.exit(0)
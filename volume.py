@@ -0,0 +1,187 @@
+# volume.py
+import shutil
+import subprocess
+import sys
+import threading
+from metrics import now
+
+
+# --- BACKENDS ---
+# set_level takes 0.0 - 1.0. Backends are created and called on the
+# controller's writer thread only.
+
+class PycawBackend:
+    # Windows endpoint volume through COM. Linear in dB between the
+    # endpoint's limits, like the original gesture.
+    name = "pycaw"
+
+    def __init__(self):
+        import comtypes
+        from ctypes import cast, POINTER
+        from comtypes import CLSCTX_ALL
+        from pycaw.pycaw import AudioUtilities, IAudioEndpointVolume
+        comtypes.CoInitialize()     # this thread's COM apartment
+        devices = AudioUtilities.GetSpeakers()
+        interface = devices.Activate(IAudioEndpointVolume._iid_, CLSCTX_ALL, None)
+        self.endpoint = cast(interface, POINTER(IAudioEndpointVolume))
+        self.min_db, self.max_db = self.endpoint.GetVolumeRange()[:2]
+
+    def set_level(self, level):
+        self.endpoint.SetMasterVolumeLevel(self.min_db + level * (self.max_db - self.min_db), None)
+
+
+class MixerBackend:
+    # Linux: PulseAudio / PipeWire through pactl, else ALSA through amixer
+    name = "mixer"
+
+    def __init__(self):
+        if shutil.which("pactl"):
+            self.cmd = ["pactl", "set-sink-volume", "@DEFAULT_SINK@"]
+        elif shutil.which("amixer"):
+            self.cmd = ["amixer", "-q", "sset", "Master"]
+        else:
+            raise RuntimeError("No pactl or amixer for the mixer volume backend")
+
+    def set_level(self, level):
+        subprocess.run(self.cmd + [f"{round(level * 100)}%"], check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+class StubBackend:
+    # Keeps the levels it was given; for tests and replays
+    name = "stub"
+
+    def __init__(self):
+        self.levels = []
+
+    def set_level(self, level):
+        self.levels.append(level)
+
+
+BACKENDS = {b.name: b for b in (PycawBackend, MixerBackend, StubBackend)}
+
+
+def make_backend(name="auto"):
+    if name == "auto":
+        name = "pycaw" if sys.platform == "win32" else "mixer"
+    return BACKENDS[name]()
+
+
+# --- CONTROLLER ---
+
+class VolumeController(threading.Thread):
+    # Fingertip distance -> system volume.
+    #   - the distance maps linearly from min_dist..max_dist to 0..1 and is
+    #     quantized to `steps` levels
+    #   - the level only changes once the hand is `hysteresis` steps past
+    #     the edge of the current one, so a hand held still does not
+    #     flicker between two levels
+    #   - the vision loop only posts; this thread writes the newest level
+    #     at no more than rate_hz, skipping repeats
+    # The backend (a name or an object) is opened on this thread.
+
+    def __init__(self, backend="auto", min_dist=50, max_dist=300, steps=50, hysteresis=0.3, rate_hz=15):
+        super().__init__(daemon=True)
+        self.backend = backend
+        self.min_dist = min_dist
+        self.max_dist = max_dist
+        self.steps = steps
+        self.hysteresis = hysteresis
+        self.interval = 1.0 / rate_hz if rate_hz > 0 else 0.0
+        self.running = False
+        self.failed = False     # backend could not be opened
+
+        self.step = None        # current quantized level, 0..steps
+        self.written = None
+        self._pending = None
+        self._cond = threading.Condition()
+
+        # Counters
+        self.writes = 0
+        self.held = 0           # updates absorbed by the hysteresis band
+        self.coalesced = 0      # levels replaced before they were written
+        self.errors = 0
+
+    @classmethod
+    def from_settings(cls, settings, backend=None):
+        controller = cls(backend if backend is not None else settings["volume_backend"])
+        controller.configure(settings)
+        return controller
+
+    def configure(self, settings):
+        # Also applied live; the backend stays as it is
+        min_dist = settings["volume_min_dist"]
+        max_dist = settings["volume_max_dist"]
+        self.min_dist = 50 if min_dist is None else min_dist
+        self.max_dist = 300 if max_dist is None else max_dist
+        if settings["volume_steps"] != self.steps:
+            self.steps = settings["volume_steps"]
+            self.step = None
+        self.hysteresis = settings["volume_hysteresis"]
+        rate_hz = settings["volume_rate_hz"]
+        self.interval = 1.0 / rate_hz if rate_hz > 0 else 0.0
+
+    def start(self):
+        self.running = True
+        super().start()
+
+    def stop(self):
+        with self._cond:
+            self.running = False
+            self._cond.notify()
+
+    @property
+    def percent(self):
+        return 0 if self.step is None else round(100 * self.step / self.steps)
+
+    def update(self, dist):
+        # Vision thread, every volume frame. Returns the level shown in %.
+        span = max(self.max_dist - self.min_dist, 1e-6)
+        x = min(max((dist - self.min_dist) / span, 0.0), 1.0) * self.steps
+        if self.step is not None and abs(x - self.step) <= 0.5 + self.hysteresis:
+            self.held += 1
+            return self.percent
+        self.step = min(max(round(x), 0), self.steps)
+        self.post(self.step / self.steps)
+        return self.percent
+
+    def post(self, level):
+        with self._cond:
+            if self._pending is not None:
+                self.coalesced += 1
+            self._pending = level
+            self._cond.notify()
+
+    def _open(self):
+        if not isinstance(self.backend, str):
+            return
+        try:
+            self.backend = make_backend(self.backend)
+        except Exception:
+            self.backend = None
+            self.failed = True
+            self.errors += 1
+
+    def _write(self, level):
+        if level == self.written or self.backend is None:
+            return
+        try:
+            self.backend.set_level(level)
+            self.written = level
+            self.writes += 1
+        except Exception:
+            self.errors += 1
+
+    def run(self):
+        self._open()
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending is not None or not self.running)
+                if not self.running:
+                    break
+                level, self._pending = self._pending, None
+            t0 = now()
+            self._write(level)
+            # Rate cap: newer levels pile up in _pending meanwhile
+            with self._cond:
+                self._cond.wait_for(lambda: not self.running, self.interval - (now() - t0))